@@ -6,6 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 from os import environ
 from exegete.api.db import Base
+from exegete.text.library import registry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -20,7 +21,7 @@ fileConfig(config.config_file_name)
 # for 'autogenerate' support
 # from myapp import mymodel
 config.set_main_option("sqlalchemy.url", environ["PG_DSN"])
-target_metadata = Base.metadata
+target_metadata = [Base.metadata, registry.metadata]
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -1,18 +1,40 @@
-import json
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi.middleware.gzip import GZipMiddleware
-from .redis import redis
+from fastapi.responses import JSONResponse
 from .routers.api import api_router
+from .scripture.catalog import CATALOG_RETRY_AFTER, CatalogNotReady
 
 app = FastAPI()
+# responses which are served pre-compressed set Content-Encoding, and are passed
+# through by GZipMiddleware
 app.add_middleware(GZipMiddleware, minimum_size=1024)
 app.include_router(api_router)
 
 
+@app.exception_handler(CatalogNotReady)
+async def catalog_not_ready(request: Request, exc: CatalogNotReady):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Scripture catalog is loading"},
+        headers={"Retry-After": str(CATALOG_RETRY_AFTER)},
+    )
+
+
+# builds the scripture catalog, and then reloads it when a module is (re-)ingested
+loader = None
+
+
 @app.on_event("startup")
 async def startup():
-    from .scripture.catalog import get_catalog_singleton
+    from .scripture.reload import load_catalog
+
+    global loader
+    # in the background, so that the worker can answer health checks straight away
+    loader = asyncio.create_task(load_catalog())
+
 
-    catalog = get_catalog_singleton()
-    toc = catalog.make_toc()
-    await redis.set("catalog", json.dumps(toc))
+@app.on_event("shutdown")
+async def shutdown():
+    if loader is not None:
+        loader.cancel()
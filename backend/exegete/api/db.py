@@ -3,7 +3,7 @@ from exegete.settings import settings
 from fastapi import Depends
 from fastapi_users.db import SQLAlchemyBaseUserTableUUID, SQLAlchemyUserDatabase
 from fastapi_users_db_sqlalchemy import GUID
-from sqlalchemy import Column, DateTime, ForeignKey, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
@@ -37,6 +37,9 @@ class Workspace(Base):
     created = Column(DateTime(timezone=True), server_default=func.now())
     updated = Column(DateTime(timezone=True), onupdate=func.now())
     data = Column(JSONB, default=False, nullable=False)
+    # incremented by every save, so that a PATCH can be checked against the version
+    # it was made from
+    version = Column(Integer, server_default="0", nullable=False)
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
@@ -0,0 +1,71 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    # Python 3.14+
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+
+# responses smaller than this aren't worth compressing (as for `GZipMiddleware`)
+MINIMUM_SIZE = 1024
+
+ENCODERS = {
+    "gzip": lambda data, level: gzip.compress(data, compresslevel=level, mtime=0)
+}
+if brotli is not None:
+    ENCODERS["br"] = lambda data, level: brotli.compress(data, quality=level)
+if zstd is not None:
+    ENCODERS["zstd"] = lambda data, level: zstd.compress(data, level=level)
+
+# the TOC is compressed once, when it is built, so it may as well be as small as it can
+MAX_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+# scripture is compressed during a request, on a cache miss: the highest levels would
+# take a second or more over a whole book
+FAST_LEVELS = {"gzip": 6, "br": 5, "zstd": 3}
+
+# in order of preference, when the client accepts more than one
+PREFERENCE = ("zstd", "br", "gzip")
+
+
+def accepted_encodings(accept_encoding):
+    """
+    the content-codings we can produce which are acceptable according to the
+    `Accept-Encoding` header, most preferred first
+    """
+    if not accept_encoding:
+        return []
+    qvalues = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (t.strip() for t in part.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    wildcard = qvalues.get("*", 0.0)
+    candidates = [
+        (qvalues.get(coding, wildcard), -idx, coding)
+        for idx, coding in enumerate(PREFERENCE)
+        if coding in ENCODERS
+    ]
+    return [coding for q, _, coding in sorted(candidates, reverse=True) if q > 0]
+
+
+def encode(data: bytes, encoding: str, levels=FAST_LEVELS):
+    return ENCODERS[encoding](data, levels[encoding])
+
+
+def encoded_etag(etag: str, encoding: str):
+    "each encoding of a resource is a different representation, and needs its own strong ETag"
+    if encoding == "identity":
+        return etag
+    return '{}-{}"'.format(etag[:-1], encoding)
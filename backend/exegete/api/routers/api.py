@@ -6,6 +6,7 @@ from ..schemas import UserCreate, UserRead, UserUpdate
 from .scripture import scripture_router
 from .workspace import workspace_router
 from .config import config_router
+from .health import health_router
 
 api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(
@@ -34,5 +35,6 @@ api_router.include_router(
     tags=["users"],
 )
 api_router.include_router(config_router)
+api_router.include_router(health_router)
 api_router.include_router(scripture_router)
 api_router.include_router(workspace_router)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ..scripture.catalog import (
+    CATALOG_RETRY_AFTER,
+    catalog_ready,
+    get_catalog_singleton,
+)
+
+health_router = APIRouter(prefix="/health", tags=["health"])
+
+
+@health_router.get("")
+async def health():
+    """
+    the worker is up, whether or not it is ready to serve scripture. once it is, the
+    hit, miss and eviction counts of its scripture caches are included.
+    """
+    if not catalog_ready():
+        return {"catalog": "loading"}
+    return {"catalog": "ready", "caches": get_catalog_singleton().cache_stats()}
+
+
+@health_router.get("/ready")
+async def ready():
+    "503 until the scripture catalog has been built"
+    if not catalog_ready():
+        return JSONResponse(
+            status_code=503,
+            content={"catalog": "loading"},
+            headers={"Retry-After": str(CATALOG_RETRY_AFTER)},
+        )
+    return {"catalog": "ready"}
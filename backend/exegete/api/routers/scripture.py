@@ -1,23 +1,121 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
 from fastapi.responses import Response
+from exegete.text.library.schema.v1 import Language
+from ..encoding import ENCODERS, accepted_encodings, encoded_etag
 from ..redis import redis
-from ..scripture.catalog import get_catalog_singleton, InvalidReference
+from ..schemas import (
+    ConcordanceOut,
+    ScriptureBatchIn,
+    ScriptureModuleSearchOut,
+    ScriptureSearchOut,
+)
+from ..scripture.catalog import (
+    get_catalog_singleton,
+    InvalidReference,
+    NoConcordance,
+)
+from ..scripture.reload import store_toc
 
 scripture_router = APIRouter(prefix="/scripture", tags=["scripture"])
 
+# the number of database connections a single batch request may use at once
+BATCH_CONCURRENCY = 4
+
+# the entry for a reference to a book which doesn't exist, in a batch response
+BOOK_NOT_FOUND = json.dumps({"detail": "Book not found"}).encode("utf8")
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# the time, in seconds, each module has to respond to a search of all modules
+SEARCH_MODULE_TIMEOUT = 2.0
+
+# modules change very rarely (only when re-ingested), and the ETag lets clients
+# revalidate cheaply once these expire
+CATALOG_CACHE_CONTROL = "public, max-age=3600"
+# verse URLs don't include the module version, so a re-ingested module would be
+# served stale from caches: they revalidate every time, which the ETag makes cheap
+VERSES_CACHE_CONTROL = "public, no-cache"
+
+
+def matching_etag(request: Request, etag: str):
+    """
+    returns the entity tag in `If-None-Match` which matches any encoding of `etag`,
+    or None if there is no match
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return None
+    etags = {etag} | {encoded_etag(etag, encoding) for encoding in ENCODERS}
+    for candidate in (t.strip() for t in if_none_match.split(",")):
+        if candidate == "*":
+            return etag
+        # a weak comparison is appropriate for If-None-Match
+        if candidate.removeprefix("W/") in etags:
+            return candidate.removeprefix("W/")
+    return None
+
+
+def not_modified(etag: str, cache_control: str):
+    return Response(
+        status_code=304,
+        headers={
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        },
+    )
+
+
+def cache_headers(etag: str, encoding: str, cache_control: str):
+    headers = {
+        "ETag": encoded_etag(etag, encoding),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding != "identity":
+        # GZipMiddleware leaves responses with a Content-Encoding alone
+        headers["Content-Encoding"] = encoding
+    return headers
+
 
 @scripture_router.get("/catalog", tags=["scripture"])
-async def get_catalog():
-    obj = await redis.get("catalog")
+async def get_catalog(request: Request):
+    catalog = get_catalog_singleton()
+    etag = catalog.toc_etag()
+    matched = matching_etag(request, etag)
+    if matched is not None:
+        return not_modified(matched, CATALOG_CACHE_CONTROL)
+    # optimisation: we store the catalog in redis as a JSON encoded
+    # bytestring, along with compressed copies, and we just spool the
+    # best one the client accepts straight back out
+    toc_key = catalog.toc_key()
+    encodings = accepted_encodings(request.headers.get("accept-encoding"))
+    encodings.append("identity")
+    keys = [toc_key if t == "identity" else toc_key + ":" + t for t in encodings]
+    variants = await redis.mget(keys)
+    if variants[-1] is None:
+        # the TOC expired after it was replaced, but this worker hasn't reloaded yet.
+        # it isn't current, so it mustn't displace the TOC of the newer catalog
+        await store_toc(catalog, current=False)
+        variants = await redis.mget(keys)
+    encoding, obj = next(
+        ((t, obj) for t, obj in zip(encodings, variants) if obj is not None),
+        (None, None),
+    )
     assert obj is not None
-    # optimisation: we store the catalog in redis as a
-    # JSON encoded bytestring and we just spool that straight back
-    # out without decoding/encoding it
-    return Response(content=obj, media_type="application/json")
+    return Response(
+        content=obj,
+        media_type="application/json",
+        headers=cache_headers(etag, encoding, CATALOG_CACHE_CONTROL),
+    )
 
 
 @scripture_router.get("/verses/{shortcode}/{book}", tags=["scripture"])
 async def get_verses(
+    request: Request,
     shortcode: str,
     book: str,
     chapter_start: int,
@@ -27,9 +125,144 @@ async def get_verses(
 ):
     try:
         catalog = get_catalog_singleton()
-        scripture_json_text = await catalog.get_scripture(
+        book_id, linear_range = await catalog.resolve_range(
             shortcode, book, chapter_start, verse_start, chapter_end, verse_end
         )
-        return Response(content=scripture_json_text, media_type="application/json")
+        etag = catalog.range_etag(shortcode, book_id, linear_range)
+        matched = matching_etag(request, etag)
+        if matched is not None:
+            return not_modified(matched, VERSES_CACHE_CONTROL)
+        encodings = accepted_encodings(request.headers.get("accept-encoding"))
+        encoding, scripture_json_text = await catalog.get_encoded_scripture(
+            shortcode,
+            book,
+            chapter_start,
+            verse_start,
+            chapter_end,
+            verse_end,
+            encodings,
+        )
+        return Response(
+            content=scripture_json_text,
+            media_type="application/json",
+            headers=cache_headers(etag, encoding, VERSES_CACHE_CONTROL),
+        )
     except InvalidReference:
         raise HTTPException(status_code=404, detail="Book not found")
+
+
+@scripture_router.post("/verses:batch", tags=["scripture"])
+async def get_verses_batch(batch: ScriptureBatchIn):
+    """
+    fetch several verse ranges in one request. the response maps the key of each
+    reference (`shortcode/book/chapter_start:verse_start-chapter_end:verse_end`)
+    to its scripture, to null if the range is empty, or to `{"detail": ...}` if the
+    book doesn't exist: one bad reference doesn't fail the others.
+    """
+    catalog = get_catalog_singleton()
+    references = {reference.key(): reference for reference in batch.references}
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def fetch(reference):
+        if (reference.shortcode, reference.book) not in catalog.shortcode_book:
+            return BOOK_NOT_FOUND
+        async with semaphore:
+            return await catalog.get_scripture(
+                reference.shortcode,
+                reference.book,
+                reference.chapter_start,
+                reference.verse_start,
+                reference.chapter_end,
+                reference.verse_end,
+            )
+
+    results = await asyncio.gather(*(fetch(t) for t in references.values()))
+    # the scripture is already JSON encoded, so we just splice it into the response
+    content = b"".join(
+        [
+            b"{",
+            b",".join(
+                json.dumps(key).encode("utf8")
+                + b":"
+                + (scripture if scripture is not None else b"null")
+                for key, scripture in zip(references, results)
+            ),
+            b"}",
+        ]
+    )
+    return Response(content=content, media_type="application/json")
+
+
+@scripture_router.get(
+    "/search", response_model=ScriptureModuleSearchOut, tags=["scripture"]
+)
+async def search_modules(
+    q: str = Query(min_length=1),
+    language: Optional[Language] = None,
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+):
+    """
+    full-text search of every module, or just those in `language`, best matches
+    first. modules which don't respond in time are listed in `timed_out`.
+    """
+    catalog = get_catalog_singleton()
+    results, timed_out = await catalog.search_modules(
+        q,
+        language.value if language is not None else None,
+        limit,
+        SEARCH_MODULE_TIMEOUT,
+    )
+    return {"results": results, "timed_out": timed_out}
+
+
+@scripture_router.get(
+    "/search/{shortcode}", response_model=ScriptureSearchOut, tags=["scripture"]
+)
+async def search(
+    shortcode: str,
+    q: str = Query(min_length=1),
+    cursor: Optional[str] = None,
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+):
+    """
+    full-text search of a module. `q` is parsed as by `websearch_to_tsquery`: words,
+    "quoted phrases", `or` and `-excluded` words. results are in canonical order, a
+    page at a time: pass `next` from the response as `cursor` to get the next page.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            book_id, linear_id = (int(t) for t in cursor.split(":"))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = (book_id, linear_id)
+    try:
+        catalog = get_catalog_singleton()
+        results, last = await catalog.search(shortcode, q, after, limit)
+    except InvalidReference:
+        raise HTTPException(status_code=404, detail="Module not found")
+    return {
+        "results": results,
+        "next": "{}:{}".format(*last) if last is not None else None,
+    }
+
+
+@scripture_router.get(
+    "/strongs/{shortcode}/{code}", response_model=ConcordanceOut, tags=["scripture"]
+)
+async def get_concordance(shortcode: str, code: str):
+    "every occurrence of a Strong's number within a module, with counts by book"
+    try:
+        catalog = get_catalog_singleton()
+        occurrences, books = await catalog.concordance(shortcode, code)
+    except InvalidReference:
+        raise HTTPException(status_code=404, detail="Module not found")
+    except NoConcordance:
+        raise HTTPException(status_code=404, detail="Module has no concordance")
+    return {
+        "code": code,
+        "count": len(occurrences),
+        "books": books,
+        "occurrences": occurrences,
+    }
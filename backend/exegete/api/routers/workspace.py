@@ -7,11 +7,18 @@ import datetime
 import sqlalchemy
 import io
 from exegete.workspace.manager import WorkspaceManager
+from exegete.workspace.patch import PatchError, PatchTestFailed, apply_patch
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 
 from ..db import User, Workspace, async_engine, async_session_maker
-from ..schemas import WorkspaceIn, WorkspaceOut, WorkspaceListingOut
+from ..schemas import (
+    WorkspaceIn,
+    WorkspaceOut,
+    WorkspaceListingOut,
+    WorkspacePatchIn,
+    WorkspaceVersionOut,
+)
 from ..users import current_user
 
 workspace_router = APIRouter(prefix="/workspace", tags=["workspace"])
@@ -80,12 +87,17 @@ async def list_workspaces(
 
 
 # we only allow PUT. UUIDs for new documents are generated on the client-side
-@workspace_router.put("/{id:uuid}")
+@workspace_router.put("/{id:uuid}", response_model=WorkspaceVersionOut)
 async def put_workspace(
     id,
     doc: WorkspaceIn,
     user: User = Depends(current_user),
 ):
+    """
+    save the whole workspace. without a version, this overwrites the workspace, even
+    if it has been saved (or patched) since the client loaded it. with a version, it
+    is a 409 if the workspace is no longer at that version, as with a PATCH.
+    """
     # validate the incoming workspace
     try:
         workspace_manager.validate(doc.data)
@@ -94,16 +106,25 @@ async def put_workspace(
 
     async with async_engine.connect() as conn:
         # fast-path: update existing document owned by the current user
+        where = [Workspace.owner_id == user.id, Workspace.id == id]
+        if doc.version is not None:
+            where.append(Workspace.version == doc.version)
         q = (
             Workspace.__table__.update()
-            .where(Workspace.owner_id == user.id, Workspace.id == id)
-            .values(title=doc.title, data=doc.data)
-            .returning(Workspace.id)
+            .where(*where)
+            .values(title=doc.title, data=doc.data, version=Workspace.version + 1)
+            .returning(Workspace.version)
         )
         success = (await conn.execute(q)).all()
         await conn.commit()
         if len(success) > 0:
-            return
+            return {"version": success[0].version}
+        if doc.version is not None:
+            q = sqlalchemy.select(Workspace.id).where(
+                Workspace.owner_id == user.id, Workspace.id == id
+            )
+            if (await conn.execute(q)).one_or_none() is not None:
+                raise HTTPException(409, "Workspace has been modified")
 
         # slow-path: update() didn't change any rows, so we need to insert a new row
         # if the document exists and the user isn't the owner, no row is inserted
@@ -112,17 +133,69 @@ async def put_workspace(
             q = (
                 Workspace.__table__.insert()
                 .values(id=id, title=doc.title, data=doc.data, owner_id=user.id)
-                .returning(Workspace.id)
+                .returning(Workspace.version)
             )
             success = (await conn.execute(q)).all()
             await conn.commit()
             if len(success) > 0:
-                return
+                return {"version": success[0].version}
             raise HTTPException(403, "You do not have permission to PUT workspace")
         except asyncpg.exceptions.UniqueViolationError:
             raise HTTPException(403, "You do not have permission to PUT workspace")
 
 
+@workspace_router.patch("/{id:uuid}", response_model=WorkspaceVersionOut)
+async def patch_workspace(
+    id,
+    doc: WorkspacePatchIn,
+    user: User = Depends(current_user),
+):
+    """
+    apply a JSON Patch to the workspace, which must still be at the version the patch
+    was made from, or this is a 409: the client should GET the workspace and retry
+    """
+    async with async_engine.connect() as conn:
+        q = sqlalchemy.select(Workspace.data, Workspace.version).where(
+            Workspace.owner_id == user.id, Workspace.id == id
+        )
+        current = (await conn.execute(q)).one_or_none()
+        if current is None:
+            raise HTTPException(403, "Workspace not found or permissions error.")
+        if current.version != doc.version:
+            raise HTTPException(409, "Workspace has been modified")
+
+        # only what the patch changed needs to be validated
+        try:
+            data = apply_patch(current.data, doc.patch)
+            workspace_manager.validate_patched(current.data, data)
+        except PatchTestFailed as exc:
+            raise HTTPException(409, str(exc))
+        except PatchError as exc:
+            raise HTTPException(422, str(exc))
+        except jsonschema.exceptions.ValidationError as exc:
+            raise HTTPException(422, str(exc))
+
+        values = {"data": data, "version": Workspace.version + 1}
+        if doc.title is not None:
+            values["title"] = doc.title
+        # the version is checked again, in case of a save since it was read
+        q = (
+            Workspace.__table__.update()
+            .where(
+                Workspace.owner_id == user.id,
+                Workspace.id == id,
+                Workspace.version == doc.version,
+            )
+            .values(**values)
+            .returning(Workspace.version)
+        )
+        success = (await conn.execute(q)).all()
+        await conn.commit()
+        if len(success) > 0:
+            return {"version": success[0].version}
+        raise HTTPException(409, "Workspace has been modified")
+
+
 @workspace_router.delete("/{id:uuid}")
 async def delete_workspace(
     id,
@@ -1,6 +1,6 @@
 from fastapi_users import schemas
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 from uuid import UUID
 import datetime
 import uuid
@@ -25,6 +25,7 @@ class WorkspaceOut(BaseModel):
     id: UUID
     title: str
     data: dict
+    version: int
     created: datetime.datetime
     updated: Optional[datetime.datetime]
 
@@ -49,6 +50,93 @@ class WorkspaceListingOut(BaseModel):
 class WorkspaceIn(BaseModel):
     title: str
     data: dict
+    # if given, the workspace is only saved if it is still at this version (as with
+    # a PATCH); otherwise it is overwritten, whatever its version
+    version: Optional[int] = None
 
     class Config:
         arbitrary_types_allowed = True
+
+
+class WorkspacePatchIn(BaseModel):
+    # the version of the workspace the patch was made from
+    version: int
+    # a JSON Patch (RFC 6902) of the workspace data
+    patch: List[dict]
+    title: Optional[str] = None
+
+
+class WorkspaceVersionOut(BaseModel):
+    version: int
+
+
+class ScriptureReference(BaseModel):
+    shortcode: str
+    book: str
+    chapter_start: int
+    verse_start: int
+    chapter_end: int
+    verse_end: int
+
+    def key(self):
+        return "{}/{}/{}:{}-{}:{}".format(
+            self.shortcode,
+            self.book,
+            self.chapter_start,
+            self.verse_start,
+            self.chapter_end,
+            self.verse_end,
+        )
+
+
+class ScriptureBatchIn(BaseModel):
+    references: List[ScriptureReference] = Field(max_length=100)
+
+
+class ScriptureSearchResult(BaseModel):
+    book: str
+    # null for objects without an address, such as book titles
+    chapter_start: Optional[int]
+    verse_start: Optional[int]
+    chapter_end: Optional[int]
+    verse_end: Optional[int]
+    rank: float
+    headline: str
+
+
+class ScriptureSearchOut(BaseModel):
+    results: List[ScriptureSearchResult]
+    # pass as `cursor` to fetch the next page; null if there are no more results
+    next: Optional[str]
+
+
+class ScriptureModuleSearchResult(ScriptureSearchResult):
+    shortcode: str
+
+
+class ScriptureModuleSearchOut(BaseModel):
+    results: List[ScriptureModuleSearchResult]
+    # modules which weren't searched in time, and so are missing from the results
+    timed_out: List[str]
+
+
+class StrongsOccurrence(BaseModel):
+    book: str
+    chapter_start: Optional[int]
+    verse_start: Optional[int]
+    chapter_end: Optional[int]
+    verse_end: Optional[int]
+    # the index of the word within the object's text
+    word: int
+
+
+class StrongsBookCount(BaseModel):
+    book: str
+    count: int
+
+
+class ConcordanceOut(BaseModel):
+    code: str
+    count: int
+    books: List[StrongsBookCount]
+    occurrences: List[StrongsOccurrence]
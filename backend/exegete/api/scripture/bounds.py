@@ -0,0 +1,57 @@
+from bisect import bisect_left, bisect_right
+
+
+class BookBounds:
+    """
+    the (chapter, verse) addresses of the objects within a book, in linear order,
+    used to turn a verse range into a range of `linear_id`
+
+    objects without an address (such as titles) are not included.
+    """
+
+    def __init__(self):
+        self.linear_ids = []
+        # running maximum of each object's (chapter_end, verse_end)
+        self._max_ends = []
+        # running minimum (from the end of the book) of each object's (chapter_start, verse_start)
+        self._min_starts = []
+
+    def append(self, linear_id, chapter_start, verse_start, chapter_end, verse_end):
+        start = (chapter_start, verse_start)
+        end = (
+            chapter_end if chapter_end is not None else chapter_start,
+            verse_end if verse_end is not None else verse_start,
+        )
+        if self._max_ends:
+            end = max(end, self._max_ends[-1])
+        self.linear_ids.append(linear_id)
+        self._max_ends.append(end)
+        self._min_starts.append(start)
+
+    def finish(self):
+        # objects are in canonical order, so this is almost always a no-op: but it means
+        # that a stray out-of-order object can't cause a range to be truncated
+        for idx in range(len(self._min_starts) - 2, -1, -1):
+            self._min_starts[idx] = min(
+                self._min_starts[idx], self._min_starts[idx + 1]
+            )
+
+    def index_range(self, chapter_start, verse_start, chapter_end, verse_end):
+        """
+        returns the (first, last) index of the objects overlapping the verse range,
+        or None if there are no such objects. a multi-verse object is included if any
+        of its verses fall within the range.
+        """
+        first = bisect_left(self._max_ends, (chapter_start, verse_start))
+        last = bisect_right(self._min_starts, (chapter_end, verse_end)) - 1
+        if first > last:
+            return None
+        return first, last
+
+    def linear_range(self, chapter_start, verse_start, chapter_end, verse_end):
+        "returns the (first, last) `linear_id` of the verse range, or None"
+        res = self.index_range(chapter_start, verse_start, chapter_end, verse_end)
+        if res is None:
+            return None
+        first, last = res
+        return self.linear_ids[first], self.linear_ids[last]
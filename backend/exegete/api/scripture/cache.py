@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+
+class VerseCache:
+    """
+    a least-recently-used cache of encoded scripture, bounded by the total
+    size in bytes of the cached values rather than by the number of entries.
+    by default the size of a value is its length.
+
+    not thread-safe; it is only accessed from the event loop.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = len(value)
+        # an object larger than the whole cache would just flush everything else out
+        if size > self.max_bytes:
+            return
+        existing = self._entries.pop(key, None)
+        if existing is not None:
+            self.size -= existing[1]
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
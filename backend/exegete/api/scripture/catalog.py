@@ -1,132 +1,233 @@
 from exegete.api.db import async_engine, sync_engine
+from exegete.settings import settings
 from exegete.text.library.manager import Manager
 from exegete.text.library.schema.v1 import Module as V1Module
+import asyncio
+import hashlib
+import heapq
+import os
 import sqlalchemy
+from glob import glob
+from sqlalchemy.dialects.postgresql import REGCONFIG, aggregate_order_by
+from .bounds import BookBounds
+from .cache import VerseCache
+from .fragments import BookText
+from .store import EXTENSION, TextStore
+from ..encoding import MINIMUM_SIZE, encode
+
+
+# increment if the structure of the TOC changes
+TOC_FORMAT = 1
 
 
 class InvalidReference(Exception):
     pass
 
 
+class NoConcordance(Exception):
+    "the module was ingested without a concordance"
+
+
+class CatalogNotReady(Exception):
+    "the catalog is still being built"
+
+
+def has_concordance(conn, schema):
+    "modules ingested before the concordance was added have no `strongs` table"
+    return sqlalchemy.inspect(conn).has_table("strongs", schema=schema)
+
+
+def english():
+    # rendered inline rather than as a parameter, so that the search expression
+    # matches the expression of `index_plaintext_tsvector`
+    return sqlalchemy.cast(
+        sqlalchemy.literal("english", literal_execute=True), REGCONFIG
+    )
+
+
 class ScriptureCatalog:
     """
     this is an app-wide singleton
     """
 
+    def __init__(self):
+        # built lazily, so that startup time doesn't depend upon the size of the modules
+        self.book_bounds = {}
+        self.book_text_cache = VerseCache(settings.book_text_cache_bytes)
+        self._book_text_loading = {}
+        # compressed scripture
+        self.verse_cache = VerseCache(settings.verse_cache_bytes)
+
     @classmethod
     def create(cls):
         "not async as only run once on application startup"
+        self = cls()
+        self._load_modules(Manager().list_modules(V1Module))
+        return self
 
-        def build_shortcode_schema():
-            res = {}
-            with sync_engine.connect() as conn:
-                for schema in self.schemas:
-                    ent = self.schema_entities[schema]
-                    module_info = ent["module_info"]
-                    obj = (conn.execute(sqlalchemy.select(module_info))).one()._asdict()
-                    res[obj["shortcode"]] = schema
-            return res
+    def reload(self):
+        """
+        a new catalog of the modules which are current now, or None if they haven't
+        changed. only the modules which are new are loaded: the others, and the caches
+        (which are keyed by module version), are shared with this catalog.
+        """
+        schemas = Manager().list_modules(V1Module)
+        if set(schemas) == set(self.schemas):
+            return None
+        catalog = type(self)()
+        catalog.book_bounds = self.book_bounds
+        catalog.book_text_cache = self.book_text_cache
+        catalog._book_text_loading = self._book_text_loading
+        catalog.verse_cache = self.verse_cache
+        catalog._load_modules(schemas, previous=self)
+        return catalog
 
-        def build_shortcode_book():
-            res = {}
-            with sync_engine.connect() as conn:
-                for schema in self.schemas:
-                    ent = self.schema_entities[schema]
-                    module_info = ent["module_info"]
-                    book = ent["book"]
-                    obj = (conn.execute(sqlalchemy.select(module_info))).one()._asdict()
-                    shortcode = obj["shortcode"]
-                    for row in conn.execute(
-                        sqlalchemy.select(book).order_by(book.columns["id"])
-                    ):
-                        book_obj = row._asdict()
-                        res[(shortcode, book_obj["name"])] = ent, book_obj["id"]
-            return res
-
-        self = ScriptureCatalog()
-        self.schemas = Manager().list_modules(V1Module)
-        self.schema_entities = {
-            schema: Manager.module_entities(V1Module, schema) for schema in self.schemas
+    def cache_stats(self):
+        "for monitoring: the caches belong to this worker, so are per-process"
+        return {
+            "book_text": self.book_text_cache.stats(),
+            "verses": self.verse_cache.stats(),
         }
-        self.shortcode_schema = build_shortcode_schema()
-        self.shortcode_book = build_shortcode_book()
-        return self
 
-    def make_toc(self):
-        "not async as only run once on application startup"
+    def _load_modules(self, schemas, previous=None):
+        """
+        load the module info and the books of each schema, other than those already
+        loaded by the `previous` catalog, which are copied from it
+        """
+        self.schemas = list(schemas)
+        self.schema_entities = {}
+        self.shortcode_schema = {}
+        self.shortcode_book = {}
+        self.shortcode_version = {}
+        self.shortcode_language = {}
+        self.concordance_shortcodes = set()
+        with sync_engine.connect() as conn:
+            for schema in self.schemas:
+                if previous is not None and schema in previous.schema_entities:
+                    self._copy_module(previous, schema)
+                    continue
+                ent = Manager.module_entities(V1Module, schema)
+                self.schema_entities[schema] = ent
+                module_info = ent["module_info"]
+                book = ent["book"]
+                obj = (conn.execute(sqlalchemy.select(module_info))).one()._asdict()
+                shortcode = obj["shortcode"]
+                self.shortcode_schema[shortcode] = schema
+                # modules which were never completed have no input hash, but the
+                # schema name is unique to each ingest so it serves as well
+                self.shortcode_version[shortcode] = obj["input_sha256"] or schema
+                self.shortcode_language[shortcode] = obj["language"].value
+                if has_concordance(conn, schema):
+                    self.concordance_shortcodes.add(shortcode)
+                for row in conn.execute(
+                    sqlalchemy.select(book).order_by(book.columns["id"])
+                ):
+                    book_obj = row._asdict()
+                    self.shortcode_book[(shortcode, book_obj["name"])] = (
+                        ent,
+                        book_obj["id"],
+                    )
+
+    def _copy_module(self, previous, schema):
+        ent = previous.schema_entities[schema]
+        self.schema_entities[schema] = ent
+        for shortcode, shortcode_schema in previous.shortcode_schema.items():
+            if shortcode_schema != schema:
+                continue
+            self.shortcode_schema[shortcode] = schema
+            self.shortcode_version[shortcode] = previous.shortcode_version[shortcode]
+            self.shortcode_language[shortcode] = previous.shortcode_language[shortcode]
+            if shortcode in previous.concordance_shortcodes:
+                self.concordance_shortcodes.add(shortcode)
+            for key, value in previous.shortcode_book.items():
+                if key[0] == shortcode:
+                    self.shortcode_book[key] = value
+
+    def toc_key(self):
+        """
+        the key under which the TOC is stored: the TOC only changes when a module is
+        (re-)ingested, so it is derived from the input hashes of the modules
+        """
+        h = hashlib.sha256()
+        for version in sorted(self.shortcode_version.values()):
+            h.update(version.encode("utf8"))
+        return "catalog:{}:{}".format(TOC_FORMAT, h.hexdigest())
+
+    def toc_etag(self):
+        "a strong ETag for the TOC"
+        return '"{}"'.format(self.toc_key().split(":", 1)[1])
+
+    def make_toc(self, schemas=None):
+        """
+        the TOC of the modules in `schemas`, or of every module. not async as it is
+        only run on application startup, or in the background on a reload
+        """
         with sync_engine.connect() as conn:
 
             def row_fields(row, fields):
                 obj = row._asdict()
                 return {field: obj[field] for field in fields}
 
-            def distinct_field(q):
-                return set(
-                    t[0]
-                    for t in (
-                        conn.execute(
-                            q.distinct(),
+            def chapter_verses(schema):
+                """
+                a single grouped query for the verses in every chapter of every book.
+                an object is listed in both its start and end chapter, with both its
+                start and end verse.
+                """
+                object = self.schema_entities[schema]["object"]
+                addresses = sqlalchemy.union(
+                    *(
+                        sqlalchemy.select(
+                            object.columns["book_id"],
+                            object.columns[chapter].label("chapter"),
+                            object.columns[verse].label("verse"),
                         )
-                    ).all()
-                    if t[0] is not None
+                        for chapter in ("chapter_start", "chapter_end")
+                        for verse in ("verse_start", "verse_end")
+                    )
+                ).subquery()
+                q = (
+                    sqlalchemy.select(
+                        addresses.c.book_id,
+                        addresses.c.chapter,
+                        sqlalchemy.func.array_agg(
+                            aggregate_order_by(addresses.c.verse, addresses.c.verse)
+                        ),
+                    )
+                    .filter(addresses.c.chapter.isnot(None))
+                    .filter(addresses.c.verse.isnot(None))
+                    .group_by(addresses.c.book_id, addresses.c.chapter)
+                    .order_by(addresses.c.book_id, addresses.c.chapter)
                 )
-
-            def verses(schema, book_id, chapter):
-                ent = self.schema_entities[schema]
-                object = ent["object"]
-
-                def q(f):
-                    return (
-                        sqlalchemy.select(object.columns[f])
-                        .filter(object.columns["book_id"] == book_id)
-                        .filter(
-                            sqlalchemy.or_(
-                                object.columns["chapter_start"] == chapter,
-                                object.columns["chapter_end"] == chapter,
-                            )
-                        )
+                res = {}
+                for book_id, chapter, verse_list in conn.execute(q):
+                    gaps = set(range(verse_list[0], verse_list[-1] + 1)) - set(
+                        verse_list
                     )
-
-                verses = set(distinct_field(q("verse_start")))
-                verses.update(set(distinct_field(q("verse_end"))))
-                verse_list = sorted(verses)
-                gaps = set(range(verse_list[0], verse_list[-1] + 1)) - verses
-                return {
-                    "first": verse_list[0],
-                    "last": verse_list[-1],
-                    "gaps": sorted(gaps),
-                }
-
-            def chapter_toc(schema, book_id):
-                ent = self.schema_entities[schema]
-                object = ent["object"]
-
-                def q(f):
-                    return sqlalchemy.select(object.columns[f]).filter(
-                        object.columns["book_id"] == book_id
+                    res.setdefault(book_id, []).append(
+                        {
+                            "chapter": chapter,
+                            "verses": {
+                                "first": verse_list[0],
+                                "last": verse_list[-1],
+                                "gaps": sorted(gaps),
+                            },
+                        }
                     )
-
-                chapters = set(distinct_field(q("chapter_start")))
-                chapters.update(set(distinct_field(q("chapter_end"))))
-                return [
-                    {
-                        "chapter": chapter,
-                        "verses": verses(schema, book_id, chapter),
-                    }
-                    for chapter in sorted(chapters)
-                ]
+                return res
 
             def books_toc(schema):
                 books = []
                 ent = self.schema_entities[schema]
                 book = ent["book"]
+                chapters = chapter_verses(schema)
                 for row in conn.execute(
                     sqlalchemy.select(book).order_by(book.columns["id"])
                 ):
                     obj = row_fields(row, ["id", "division", "name"])
                     id = obj.pop("id")
                     obj["division"] = obj["division"].value
-                    obj["chapters"] = chapter_toc(schema, id)
+                    obj["chapters"] = chapters.get(id, [])
                     books.append(obj)
                 return books
 
@@ -155,88 +256,416 @@ class ScriptureCatalog:
                 return shortcode, obj
 
             res = {}
-            for schema in self.schemas:
+            for schema in self.schemas if schemas is None else schemas:
                 shortcode, obj = schema_toc(schema)
                 res[shortcode] = obj
             return res
 
-    async def get_scripture(
+    def _addressed_objects(self, schema, book_id, *columns):
+        "objects without an address (titles) are not part of any verse range"
+        object = self.schema_entities[schema]["object"]
+        return (
+            sqlalchemy.select(*columns)
+            .filter(object.columns["book_id"] == book_id)
+            .filter(object.columns["chapter_start"].isnot(None))
+            .filter(object.columns["verse_start"].isnot(None))
+            .order_by(object.columns["linear_id"])
+        )
+
+    async def get_book_bounds(self, schema, book_id):
+        key = (schema, book_id)
+        if key in self.book_bounds:
+            return self.book_bounds[key]
+        object = self.schema_entities[schema]["object"]
+        q = self._addressed_objects(
+            schema,
+            book_id,
+            object.columns["linear_id"],
+            object.columns["chapter_start"],
+            object.columns["verse_start"],
+            object.columns["chapter_end"],
+            object.columns["verse_end"],
+        )
+        bounds = BookBounds()
+        async with async_engine.connect() as conn:
+            for row in await conn.execute(q):
+                bounds.append(*row)
+        bounds.finish()
+        self.book_bounds[key] = bounds
+        return bounds
+
+    def book_objects(self, schema, book_id):
+        """
+        a query for the addressed objects in a book, in linear order: the `linear_id`,
+        address and JSON encoding of each object
+        """
+        object = self.schema_entities[schema]["object"]
+        subq = self._addressed_objects(
+            schema,
+            book_id,
+            object.columns["linear_id"],
+            object.columns["chapter_start"],
+            object.columns["verse_start"],
+            object.columns["chapter_end"],
+            object.columns["verse_end"],
+            object.columns["type"],
+            object.columns["text"],
+        ).subquery()
+        # each object is serialised by PostgreSQL, exactly as `jsonb_agg` would
+        return sqlalchemy.select(
+            subq.c.linear_id,
+            subq.c.chapter_start,
+            subq.c.verse_start,
+            subq.c.chapter_end,
+            subq.c.verse_end,
+            sqlalchemy.cast(
+                sqlalchemy.func.to_jsonb(subq.table_valued()).op("-")("linear_id"),
+                sqlalchemy.String,
+            ),
+        ).order_by(subq.c.linear_id)
+
+    async def _load_book_text(self, schema, book_id):
+        q = self.book_objects(schema, book_id)
+        async with async_engine.connect() as conn:
+            res = await conn.execute(q)
+            book_text = BookText(row[-1].encode("utf8") for row in res)
+        self.book_text_cache.put((schema, book_id), book_text, book_text.size)
+        return book_text
+
+    async def get_book_text(self, schema, book_id):
+        """
+        the book's text is loaded in one query the first time it is needed. concurrent
+        requests for a book which is being loaded wait for that load to finish.
+        """
+        key = (schema, book_id)
+        book_text = self.book_text_cache.get(key)
+        if book_text is not None:
+            return book_text
+        loading = self._book_text_loading.get(key)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load_book_text(schema, book_id))
+            self._book_text_loading[key] = loading
+            loading.add_done_callback(lambda _: self._book_text_loading.pop(key, None))
+        return await asyncio.shield(loading)
+
+    async def resolve_range(
         self, shortcode, book, chapter_start, verse_start, chapter_end, verse_end
     ):
-        "returns JSON encoded scripture"
+        """
+        returns the book ID and the (first, last) `linear_id` of the objects in the
+        verse range. the `linear_id` range is None if the verse range is empty.
+        """
         if (shortcode, book) not in self.shortcode_book:
             raise InvalidReference(f"{shortcode} {book}")
-        ent, book_id = self.shortcode_book[(shortcode, book)]
+        _, book_id = self.shortcode_book[(shortcode, book)]
+        bounds = await self.get_book_bounds(self.shortcode_schema[shortcode], book_id)
+        return book_id, bounds.linear_range(
+            chapter_start, verse_start, chapter_end, verse_end
+        )
+
+    def _search_query(self, shortcode, query):
+        if shortcode not in self.shortcode_schema:
+            raise InvalidReference(shortcode)
+        ent = self.schema_entities[self.shortcode_schema[shortcode]]
         object = ent["object"]
-        bk = object.columns["book_id"]
-        cs = object.columns["chapter_start"]
-        # FIXME: that `ce` and `ve` aren't used indicates a potential bug with
-        # multi-verse or multi-chapter objects (which we don't actually have at
-        # the moment.
-        # ce = object.columns["chapter_end"]
-        vs = object.columns["verse_start"]
-        # ve = object.columns["verse_end"]
-        li = object.columns["linear_id"]
-
-        # a bit fiddly, we have four cases:
-        #
-        # we're in the start chapter and in the end chapter, so we need to
-        # check both verse ranges...
-        verse_cs_ce = (
-            (cs == chapter_start)
-            & (cs == chapter_end)
-            & (vs >= verse_start)
-            & (vs <= verse_end)
+        book = ent["book"]
+        tsvector = sqlalchemy.func.to_tsvector(english(), object.columns["plaintext"])
+        tsquery = sqlalchemy.func.websearch_to_tsquery(english(), query)
+        return object, (
+            sqlalchemy.select(
+                book.columns["name"].label("book"),
+                object.columns["book_id"],
+                object.columns["linear_id"],
+                object.columns["chapter_start"],
+                object.columns["verse_start"],
+                object.columns["chapter_end"],
+                object.columns["verse_end"],
+                sqlalchemy.func.ts_rank(tsvector, tsquery).label("rank"),
+                sqlalchemy.func.ts_headline(
+                    english(), object.columns["plaintext"], tsquery
+                ).label("headline"),
+            )
+            .join(book, book.columns["id"] == object.columns["book_id"])
+            .filter(tsvector.op("@@")(tsquery))
+        )
+
+    async def search(self, shortcode, query, after, limit):
+        """
+        full-text search of the objects in a module, in canonical order. `after` is
+        the (book_id, linear_id) of the last result of the previous page, or None.
+        returns up to `limit` results, and the (book_id, linear_id) to continue from
+        if there may be more.
+        """
+        object, q = self._search_query(shortcode, query)
+        q = (
+            q.order_by(object.columns["book_id"], object.columns["linear_id"])
+            # one extra, to find out whether there's another page
+            .limit(limit + 1)
         )
-        # ... or we're in the start chapter and not in the end chapter, so
-        # we need to check the first verse range...
-        verse_cs_not_ce = (
-            (cs == chapter_start) & (cs < chapter_end) & (vs >= verse_start)
+        if after is not None:
+            q = q.filter(
+                sqlalchemy.tuple_(
+                    object.columns["book_id"], object.columns["linear_id"]
+                )
+                > sqlalchemy.tuple_(*after)
+            )
+        async with async_engine.connect() as conn:
+            results = [row._asdict() for row in await conn.execute(q)]
+        if len(results) <= limit:
+            return results, None
+        results = results[:limit]
+        return results, (results[-1]["book_id"], results[-1]["linear_id"])
+
+    async def search_ranked(self, shortcode, query, limit):
+        "the `limit` best matches for a full-text search of a module, best first"
+        object, q = self._search_query(shortcode, query)
+        q = q.order_by(
+            sqlalchemy.desc("rank"),
+            object.columns["book_id"],
+            object.columns["linear_id"],
+        ).limit(limit)
+        async with async_engine.connect() as conn:
+            return [row._asdict() for row in await conn.execute(q)]
+
+    async def search_modules(self, query, language, limit, timeout):
+        """
+        full-text search of every module (or those in `language`), best matches first.
+        the modules are searched concurrently, each for up to `limit` results within
+        `timeout` seconds. returns the merged results, and the shortcodes of any
+        modules which ran out of time.
+        """
+        shortcodes = [
+            shortcode
+            for shortcode in self.shortcode_schema
+            if language is None or self.shortcode_language[shortcode] == language
+        ]
+
+        async def search_module(shortcode):
+            try:
+                results = await asyncio.wait_for(
+                    self.search_ranked(shortcode, query, limit), timeout
+                )
+            except asyncio.TimeoutError:
+                return None
+            return [dict(result, shortcode=shortcode) for result in results]
+
+        module_results = await asyncio.gather(*(search_module(t) for t in shortcodes))
+        timed_out = [
+            shortcode
+            for shortcode, results in zip(shortcodes, module_results)
+            if results is None
+        ]
+        # each module's results are already ranked, so they just need merging
+        merged = heapq.merge(
+            *(results for results in module_results if results is not None),
+            key=lambda result: -result["rank"],
         )
-        # ... or we're in the end chapter and not in the start chapter, so
-        # we need to check the last verse range...
-        verse_not_cs_ce = (cs > chapter_start) & (cs == chapter_end) & (vs <= verse_end)
-        # ... or we're between the start and end chapter, so no need to
-        # check verse ranges.
-        verse_not_cs_not_ce = (cs > chapter_start) & (cs < chapter_end)
-
-        subq = (
+        return [result for _, result in zip(range(limit), merged)], timed_out
+
+    async def concordance(self, shortcode, code):
+        """
+        every occurrence of a Strong's number in a module, in canonical order, and
+        the number of occurrences in each book
+        """
+        if shortcode not in self.shortcode_schema:
+            raise InvalidReference(shortcode)
+        if shortcode not in self.concordance_shortcodes:
+            raise NoConcordance(shortcode)
+        ent = self.schema_entities[self.shortcode_schema[shortcode]]
+        strongs = ent["strongs"]
+        object = ent["object"]
+        book = ent["book"]
+        q = (
             sqlalchemy.select(
+                book.columns["name"].label("book"),
                 object.columns["chapter_start"],
                 object.columns["verse_start"],
                 object.columns["chapter_end"],
                 object.columns["verse_end"],
-                object.columns["type"],
-                object.columns["text"],
+                strongs.columns["word"],
             )
-            .filter(bk == book_id)
-            .filter(
-                sqlalchemy.or_(
-                    verse_cs_ce,
-                    verse_cs_not_ce,
-                    verse_not_cs_ce,
-                    verse_not_cs_not_ce,
-                )
+            .select_from(strongs)
+            .join(
+                object,
+                (object.columns["book_id"] == strongs.columns["book_id"])
+                & (object.columns["linear_id"] == strongs.columns["linear_id"]),
             )
-            .order_by(li)
-        ).subquery()
+            .join(book, book.columns["id"] == strongs.columns["book_id"])
+            .filter(strongs.columns["code"] == code)
+            .order_by(
+                strongs.columns["book_id"],
+                strongs.columns["linear_id"],
+                strongs.columns["word"],
+            )
+        )
+        async with async_engine.connect() as conn:
+            occurrences = [row._asdict() for row in await conn.execute(q)]
+        books = {}
+        for occurrence in occurrences:
+            books[occurrence["book"]] = books.get(occurrence["book"], 0) + 1
+        return occurrences, [{"book": t, "count": n} for t, n in books.items()]
 
-        q = sqlalchemy.select(
-            sqlalchemy.cast(
-                sqlalchemy.func.jsonb_agg(subq.table_valued()), sqlalchemy.String
+    def range_etag(self, shortcode, book_id, linear_range):
+        "a strong ETag for the JSON encoded scripture in a resolved range"
+        h = hashlib.sha256(
+            "{}:{}:{}:{}".format(
+                shortcode, self.shortcode_version[shortcode], book_id, linear_range
+            ).encode("utf8")
+        )
+        return '"{}"'.format(h.hexdigest())
+
+    def _cache_key(self, shortcode, book_id, linear_range):
+        # module content never changes after ingest, and a re-ingest changes the version
+        return (shortcode, self.shortcode_version[shortcode], book_id, linear_range)
+
+    async def get_scripture(
+        self, shortcode, book, chapter_start, verse_start, chapter_end, verse_end
+    ):
+        "returns JSON encoded scripture"
+        if (shortcode, book) not in self.shortcode_book:
+            raise InvalidReference(f"{shortcode} {book}")
+        _, book_id = self.shortcode_book[(shortcode, book)]
+        schema = self.shortcode_schema[shortcode]
+        bounds = await self.get_book_bounds(schema, book_id)
+        index_range = bounds.index_range(
+            chapter_start, verse_start, chapter_end, verse_end
+        )
+        if index_range is None:
+            # empty range
+            return None
+        book_text = await self.get_book_text(schema, book_id)
+        return book_text.json_array(*index_range)
+
+    async def get_encoded_scripture(
+        self,
+        shortcode,
+        book,
+        chapter_start,
+        verse_start,
+        chapter_end,
+        verse_end,
+        encodings,
+    ):
+        """
+        returns the content-coding used, and JSON encoded scripture compressed with the
+        first of `encodings`. small responses aren't compressed. the compressed scripture
+        is cached.
+        """
+        book_id, linear_range = await self.resolve_range(
+            shortcode, book, chapter_start, verse_start, chapter_end, verse_end
+        )
+        if linear_range is None:
+            # empty range
+            return "identity", None
+        if encodings:
+            cache_key = self._cache_key(shortcode, book_id, linear_range) + (
+                encodings[0],
             )
-        ).select_from(subq)
+            compressed = self.verse_cache.get(cache_key)
+            if compressed is not None:
+                return encodings[0], compressed
+        content = await self.get_scripture(
+            shortcode, book, chapter_start, verse_start, chapter_end, verse_end
+        )
+        if not encodings or len(content) < MINIMUM_SIZE:
+            return "identity", content
+        # off the event loop, as a whole book takes milliseconds to compress
+        compressed = await asyncio.to_thread(encode, content, encodings[0])
+        self.verse_cache.put(cache_key, compressed)
+        return encodings[0], compressed
 
-        async with async_engine.connect() as conn:
-            res = (await conn.execute(q)).one()
-            return res[0]
+
+class StoreScriptureCatalog(ScriptureCatalog):
+    """
+    a catalog served from the text stores written by `exegete.api.scripture.export`,
+    rather than from the database. the stores are memory mapped, so the text of each
+    module is shared between the API workers on a host.
+    """
+
+    @classmethod
+    def create(cls, path):
+        self = cls()
+        self.stores = {}
+        for fname in sorted(glob(os.path.join(path, "*" + EXTENSION))):
+            store = TextStore(fname)
+            self.stores[store.header["schema"]] = store
+        self.schemas = list(self.stores)
+        # search is still done in the database, from which the stores were exported
+        self.schema_entities = {
+            schema: Manager.module_entities(V1Module, schema) for schema in self.schemas
+        }
+        self.shortcode_schema = {}
+        self.shortcode_book = {}
+        self.shortcode_version = {}
+        self.shortcode_language = {}
+        self.concordance_shortcodes = set()
+        with sync_engine.connect() as conn:
+            for schema, store in self.stores.items():
+                shortcode = store.header["shortcode"]
+                self.shortcode_schema[shortcode] = schema
+                self.shortcode_version[shortcode] = store.header["version"]
+                self.shortcode_language[shortcode] = store.header["toc"]["language"]
+                # as is the concordance
+                if has_concordance(conn, schema):
+                    self.concordance_shortcodes.add(shortcode)
+                for book in store.header["books"]:
+                    self.shortcode_book[(shortcode, book["name"])] = None, book["id"]
+        return self
+
+    def reload(self):
+        # the stores only change when they are exported again, which needs a restart
+        return None
+
+    def make_toc(self, schemas=None):
+        return {
+            store.header["shortcode"]: store.header["toc"]
+            for schema, store in self.stores.items()
+            if schemas is None or schema in schemas
+        }
+
+    async def get_book_bounds(self, schema, book_id):
+        key = (schema, book_id)
+        if key not in self.book_bounds:
+            self.book_bounds[key] = self.stores[schema].book_bounds(book_id)
+        return self.book_bounds[key]
+
+    async def _load_book_text(self, schema, book_id):
+        book_text = self.stores[schema].book_text(book_id)
+        self.book_text_cache.put((schema, book_id), book_text, book_text.size)
+        return book_text
 
 
 __catalog_store = {}
+# seconds a client should wait before retrying, while the catalog is loading
+CATALOG_RETRY_AFTER = 5
+
+
+def create_catalog():
+    "not async: run on a thread, so as not to block the event loop"
+    if settings.text_store_path:
+        return StoreScriptureCatalog.create(settings.text_store_path)
+    return ScriptureCatalog.create()
+
+
+def catalog_ready():
+    return "c" in __catalog_store
 
 
 def get_catalog_singleton():
+    """
+    the catalog is built in the background on startup (see `reload.load_catalog`),
+    and until it is ready this raises `CatalogNotReady`
+    """
     global __catalog_store
     if "c" not in __catalog_store:
-        __catalog_store["c"] = ScriptureCatalog.create()
+        raise CatalogNotReady()
     return __catalog_store["c"]
+
+
+def swap_catalog_singleton(catalog):
+    """
+    replace the catalog. requests in flight carry on with the catalog they already
+    have, and later requests get this one.
+    """
+    global __catalog_store
+    __catalog_store["c"] = catalog
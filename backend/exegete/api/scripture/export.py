@@ -0,0 +1,52 @@
+# export the scripture modules in the database to text stores, which the API can
+# serve from by setting `text_store_path`
+
+import argparse
+import os
+from exegete.api.db import sync_engine
+from .catalog import ScriptureCatalog
+from .store import EXTENSION, write_text_store
+
+
+def export(path):
+    catalog = ScriptureCatalog.create()
+    toc = catalog.make_toc()
+    os.makedirs(path, exist_ok=True)
+    with sync_engine.connect() as conn:
+
+        def book_objects(schema, book_id):
+            for row in conn.execute(catalog.book_objects(schema, book_id)):
+                *address, obj = row
+                yield (*address, obj.encode("utf8"))
+
+        for shortcode, schema in catalog.shortcode_schema.items():
+            books = [
+                ({"id": book_id, "name": name}, book_objects(schema, book_id))
+                for (book_shortcode, name), (_, book_id) in sorted(
+                    catalog.shortcode_book.items(), key=lambda item: item[1][1]
+                )
+                if book_shortcode == shortcode
+            ]
+            fname = os.path.join(path, shortcode + EXTENSION)
+            write_text_store(
+                fname,
+                {
+                    "schema": schema,
+                    "shortcode": shortcode,
+                    "version": catalog.shortcode_version[shortcode],
+                    "toc": toc[shortcode],
+                },
+                books,
+            )
+            print("exported {} to {}".format(shortcode, fname))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    args = parser.parse_args()
+    export(args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from array import array
+
+
+class BookText:
+    """
+    the JSON encoding of each addressed object in a book, serialised once into a
+    single buffer in linear order. the objects are in the same order as in
+    `BookBounds`, so a verse range is a contiguous slice of the buffer.
+    """
+
+    # PostgreSQL separates the elements of a JSONB array with this
+    SEPARATOR = b", "
+
+    def __init__(self, objects):
+        buf = bytearray()
+        self._starts = array("Q")
+        self._ends = array("Q")
+        for obj in objects:
+            if buf:
+                buf += self.SEPARATOR
+            self._starts.append(len(buf))
+            buf += obj
+            self._ends.append(len(buf))
+        self._buffer = bytes(buf)
+        self._view = memoryview(self._buffer)
+
+    @classmethod
+    def from_buffer(cls, buffer, starts, ends):
+        """
+        a book's text which has already been laid out, such as a slice of a text
+        store. `buffer` is not copied.
+        """
+        self = cls.__new__(cls)
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._starts = starts
+        self._ends = ends
+        return self
+
+    def __len__(self):
+        return len(self._starts)
+
+    @property
+    def size(self):
+        "approximate memory used, in bytes"
+        return len(self._buffer) + self._starts.itemsize * 2 * len(self._starts)
+
+    def json_array(self, first, last):
+        """
+        the JSON array of objects `first` to `last` (inclusive), encoded exactly as
+        `jsonb_agg` would encode it
+        """
+        return b"".join(
+            (b"[", self._view[self._starts[first] : self._ends[last]], b"]")
+        )
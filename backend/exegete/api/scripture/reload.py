@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import time
+from exegete.text.library.manager import MODULES_CHANNEL, Manager
+from ..encoding import ENCODERS, MAX_LEVELS, encode
+from ..redis import redis
+from .catalog import create_catalog, get_catalog_singleton, swap_catalog_singleton
+
+logger = logging.getLogger(__name__)
+
+# the time, in seconds, to wait before subscribing again if the connection is lost
+RESUBSCRIBE_DELAY = 5.0
+# the time, in seconds, to wait before trying again if building the catalog fails
+CATALOG_RETRY_DELAY = 5.0
+
+# the key of the most recently stored TOC
+CURRENT_TOC_KEY = "catalog:current"
+# the time, in seconds, that a TOC is kept after it is replaced, for any worker which
+# is still serving the catalog it belongs to
+TOC_EXPIRE = 3600
+
+# only one reload of the catalog at a time in each worker
+_reloading = asyncio.Lock()
+
+
+def merge_toc(catalog, previous, previous_toc):
+    """
+    the TOC of `catalog`, taking the TOC of each module it shares with the `previous`
+    catalog from `previous_toc`, so that only new modules are queried
+    """
+    new_schemas = [
+        schema for schema in catalog.schemas if schema not in previous.schema_entities
+    ]
+    new_toc = catalog.make_toc(new_schemas)
+    toc = {}
+    for schema in catalog.schemas:
+        shortcode = Manager.schema_shortcode(schema)
+        toc[shortcode] = (
+            new_toc[shortcode] if schema in new_schemas else previous_toc[shortcode]
+        )
+    return toc
+
+
+async def store_toc(catalog, previous=None, current=True):
+    """
+    store the TOC of `catalog` in redis, unless it is already there. only one worker
+    builds each TOC, and the others wait for it. returns whether this worker built it.
+
+    a TOC which isn't `current` is of a catalog that has been replaced, and which a
+    worker is still serving: it is stored to expire, and the current TOC is left alone.
+    """
+    toc_key = catalog.toc_key()
+    if await redis.exists(toc_key):
+        return False
+    async with redis.lock(toc_key + ":lock", timeout=600):
+        if await redis.exists(toc_key):
+            return False
+        previous_toc = None
+        if previous is not None:
+            previous_toc = await redis.get(previous.toc_key())
+        if previous_toc is None:
+            toc = await asyncio.to_thread(catalog.make_toc)
+        else:
+            toc = await asyncio.to_thread(
+                merge_toc, catalog, previous, json.loads(previous_toc)
+            )
+        toc = json.dumps(toc).encode("utf8")
+        # the TOC is served pre-compressed, so compress it once here
+        expire = None if current else TOC_EXPIRE
+        async with redis.pipeline(transaction=True) as pipe:
+            for encoding in ENCODERS:
+                pipe.set(
+                    toc_key + ":" + encoding,
+                    encode(toc, encoding, MAX_LEVELS),
+                    ex=expire,
+                )
+            pipe.set(toc_key, toc, ex=expire)
+            if current:
+                pipe.set(CURRENT_TOC_KEY, toc_key, get=True)
+            results = await pipe.execute()
+        replaced = results[-1] if current else None
+        if replaced is not None and replaced.decode("utf8") != toc_key:
+            await expire_toc(replaced.decode("utf8"))
+    return True
+
+
+async def expire_toc(toc_key):
+    "a TOC has been replaced, so let it (and its compressed copies) expire"
+    async with redis.pipeline(transaction=True) as pipe:
+        for encoding in ENCODERS:
+            pipe.expire(toc_key + ":" + encoding, TOC_EXPIRE)
+        pipe.expire(toc_key, TOC_EXPIRE)
+        await pipe.execute()
+
+
+async def reload_catalog():
+    """
+    load any new versions of modules into a new catalog, in the background, and then
+    swap it in
+    """
+    async with _reloading:
+        start = time.monotonic()
+        previous = get_catalog_singleton()
+        catalog = await asyncio.to_thread(previous.reload)
+        if catalog is None:
+            return
+        # the TOC has to be in redis before the catalog is served
+        await store_toc(catalog, previous)
+        swap_catalog_singleton(catalog)
+        logger.info(
+            "scripture catalog reloaded in {:.3f}s ({} modules)".format(
+                time.monotonic() - start, len(catalog.schemas)
+            )
+        )
+
+
+async def watch_modules():
+    "reload the catalog whenever a new version of a module is promoted"
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(MODULES_CHANNEL)
+                # catch up with anything promoted while we weren't subscribed
+                await reload_catalog()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        logger.info(
+                            "module promoted: {}".format(message["data"].decode("utf8"))
+                        )
+                        await reload_catalog()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("lost the subscription to promoted modules")
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+
+async def load_catalog():
+    """
+    build the catalog on a thread, so that the event loop isn't blocked: until it is
+    ready, requests for scripture get a 503. then watch for new modules.
+    """
+    while True:
+        start = time.monotonic()
+        try:
+            catalog = await asyncio.to_thread(create_catalog)
+            built = await store_toc(catalog)
+            break
+        except Exception:
+            logger.exception("failed to build the scripture catalog")
+            await asyncio.sleep(CATALOG_RETRY_DELAY)
+    swap_catalog_singleton(catalog)
+    logger.info(
+        "scripture catalog {} in {:.3f}s ({} modules)".format(
+            "built" if built else "loaded",
+            time.monotonic() - start,
+            len(catalog.schemas),
+        )
+    )
+    await watch_modules()
@@ -0,0 +1,132 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from .bounds import BookBounds
+from .fragments import BookText
+
+# a text store is a read-only file holding the text of one module:
+#
+#   preamble: magic, format, offset and length of the header
+#   for each book:
+#     an address table, with one entry per addressed object in linear order:
+#       linear_id, chapter_start, verse_start, chapter_end, verse_end,
+#       start and end offset of the object's JSON within the book's text
+#     the book's text: the JSON of each object, as laid out by `BookText`
+#   header: JSON describing the module, its TOC and the location of each book
+
+MAGIC = b"EXV1TEXT"
+FORMAT = 1
+PREAMBLE = struct.Struct("<8sIQQ")
+ADDRESS = struct.Struct("<iiiiiQQ")
+# chapter_end and verse_end may be NULL
+NULL = -1
+EXTENSION = ".exv1"
+
+
+class InvalidTextStore(Exception):
+    pass
+
+
+def write_text_store(fname, module, books):
+    """
+    `module` is a dict which is stored in the header. `books` is an iterable of
+    (book, objects), where `book` is a dict which is stored in the header, and
+    `objects` is an iterable of (linear_id, chapter_start, verse_start, chapter_end,
+    verse_end, JSON encoded object) in linear order.
+
+    the file is written alongside `fname` and then moved into place, so readers
+    never see a partially written store.
+    """
+
+    def nullable(v):
+        return NULL if v is None else v
+
+    tmp_fname = fname + ".tmp"
+    book_headers = []
+    with open(tmp_fname, "wb") as fd:
+        fd.write(PREAMBLE.pack(MAGIC, FORMAT, 0, 0))
+        for book, objects in books:
+            addresses = bytearray()
+            book_text = bytearray()
+            count = 0
+            for linear_id, cs, vs, ce, ve, obj in objects:
+                if book_text:
+                    book_text += BookText.SEPARATOR
+                start = len(book_text)
+                book_text += obj
+                addresses += ADDRESS.pack(
+                    linear_id, cs, vs, nullable(ce), nullable(ve), start, len(book_text)
+                )
+                count += 1
+            address_offset = fd.tell()
+            fd.write(addresses)
+            text_offset = fd.tell()
+            fd.write(book_text)
+            book_headers.append(
+                {
+                    **book,
+                    "count": count,
+                    "address_offset": address_offset,
+                    "text_offset": text_offset,
+                    "text_length": len(book_text),
+                }
+            )
+        header = json.dumps({**module, "books": book_headers}).encode("utf8")
+        header_offset = fd.tell()
+        fd.write(header)
+        fd.seek(0)
+        fd.write(PREAMBLE.pack(MAGIC, FORMAT, header_offset, len(header)))
+    os.replace(tmp_fname, fname)
+
+
+class TextStore:
+    """
+    a text store, memory mapped. the text of a book is served directly from the
+    mapping, so is shared between processes and paged in by the OS as needed.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        with open(fname, "rb") as fd:
+            self._mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, format, header_offset, header_length = PREAMBLE.unpack_from(
+            self._mmap, 0
+        )
+        if magic != MAGIC or format != FORMAT:
+            raise InvalidTextStore(fname)
+        self.header = json.loads(
+            bytes(self._view[header_offset : header_offset + header_length])
+        )
+        self.books = {book["id"]: book for book in self.header["books"]}
+
+    def _addresses(self, book_id):
+        book = self.books[book_id]
+        offset = book["address_offset"]
+        return ADDRESS.iter_unpack(
+            self._view[offset : offset + book["count"] * ADDRESS.size]
+        )
+
+    def book_bounds(self, book_id):
+        def nullable(v):
+            return None if v == NULL else v
+
+        bounds = BookBounds()
+        for linear_id, cs, vs, ce, ve, _, _ in self._addresses(book_id):
+            bounds.append(linear_id, cs, vs, nullable(ce), nullable(ve))
+        bounds.finish()
+        return bounds
+
+    def book_text(self, book_id):
+        book = self.books[book_id]
+        starts = array("Q")
+        ends = array("Q")
+        for _, _, _, _, _, start, end in self._addresses(book_id):
+            starts.append(start)
+            ends.append(end)
+        offset = book["text_offset"]
+        return BookText.from_buffer(
+            self._view[offset : offset + book["text_length"]], starts, ends
+        )
@@ -1,4 +1,5 @@
 import sqlalchemy
+from typing import Optional
 from sqlalchemy.ext.asyncio import create_async_engine
 from pydantic import PostgresDsn, EmailStr
 from pydantic_settings import BaseSettings
@@ -15,6 +16,12 @@ class Settings(BaseSettings):
     recaptcha_secret_key: str
     redis_location: str
     base_url: str
+    # upper bounds on the memory used by each API worker to cache scripture
+    book_text_cache_bytes: int = 256 * 1024 * 1024
+    verse_cache_bytes: int = 64 * 1024 * 1024
+    # if set, scripture is served from the text stores in this directory (see
+    # `exegete.api.scripture.export`) rather than from the database
+    text_store_path: Optional[str] = None
 
     def create_sync_engine(self, **kwargs):
         return sqlalchemy.create_engine(
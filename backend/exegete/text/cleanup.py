@@ -1,8 +1,19 @@
+import functools
 import re
 import string
 from nltk.stem import SnowballStemmer
 
 whitespace_re = re.compile(r"^\s*$")
+# a single whitespace character: `\s` matches exactly the characters for which
+# `str.isspace()` is true
+word_break_re = re.compile(r"\s")
+punctuation_trans = str.maketrans("", "", string.punctuation + "‘’“”\"'—,…")
+stemmer = SnowballStemmer("english")
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def stem_word(word):
+    return stemmer.stem(word)
 
 
 def introduce_spaces(s):
@@ -32,47 +43,37 @@ def clean_words(fragments_iter, stem=False):
     # words actually are.
 
     words = []
-    buf = []
-
-    def buf_to_word(buf):
-        if len(buf) == 0:
-            return {"value": ""}
-        # take the attributes from the first character
-        a = buf[0][0]
-        return {**a, "value": "".join(t[1] for t in buf)}
+    # the word being built up: its attributes are those of the fragment holding its first character
+    word_attrs = None
+    word_parts = []
 
-    def scan_word(buf):
-        for idx, (_, c) in enumerate(buf):
-            if c.isspace():
-                return buf[idx + 1 :], buf_to_word(buf[:idx])
-        return buf, None
+    def end_word():
+        nonlocal word_attrs
+        if word_parts:
+            words.append({**word_attrs, "value": "".join(word_parts)})
+            word_parts.clear()
+        word_attrs = None
 
     for fragment in fragments_iter:
         # we emit a new word when we hit whitespace
         attrs = fragment.copy()
         value = attrs.pop("value")
-        buf += [(attrs, t) for t in value]
-
-        while True:
-            buf, next_word = scan_word(buf)
-            if next_word is not None:
-                if next_word["value"]:
-                    words.append(next_word)
-            else:
-                break
-
-    if len(buf) > 0:
-        words.append(buf_to_word(buf))
+        for idx, part in enumerate(word_break_re.split(value)):
+            if idx > 0:
+                end_word()
+            if part:
+                if not word_parts:
+                    word_attrs = attrs
+                word_parts.append(part)
+    end_word()
 
-    trans = str.maketrans("", "", string.punctuation + "‘’“”\"'—,…")
-    stemmer = SnowballStemmer("english")
     for word in words:
         value = word["value"]
-        nopunct = word["value"].translate(trans)
+        nopunct = value.translate(punctuation_trans)
         if nopunct != value:
             word["s-nopunct"] = nopunct
         if stem:
-            snowball = stemmer.stem(nopunct)
+            snowball = stem_word(nopunct)
             if snowball != value:
                 word["s-snowball"] = snowball
 
@@ -0,0 +1,33 @@
+# build the concordance of Strong's numbers for modules ingested before it
+# was added to the schema. the API checks for the concordance when it loads a
+# module, so restart it afterwards
+
+from exegete.text.library import Manager
+from exegete.text.library.schema import v1
+import sqlalchemy
+
+
+def backfill():
+    manager = Manager()
+    for schema in manager.list_modules(v1.Module):
+        entities = Manager.module_entities(v1.Module, schema)
+        strongs = entities["strongs"]
+        if sqlalchemy.inspect(manager.engine).has_table("strongs", schema=schema):
+            print("{}: already has a concordance".format(schema))
+            continue
+        with manager.engine.connect() as conn:
+            strongs.create(conn)
+            v1.Module.build_concordance(conn, entities)
+            conn.commit()
+            count = conn.execute(
+                sqlalchemy.select(sqlalchemy.func.count()).select_from(strongs)
+            ).scalar()
+        print("{}: {} occurrences".format(schema, count))
+
+
+def main():
+    backfill()
+
+
+if __name__ == "__main__":
+    main()
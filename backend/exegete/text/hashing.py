@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import os
+
+CHUNK_SIZE = 1 << 16
+# hashlib releases the GIL while hashing, so threads hash files in parallel
+HASH_WORKERS = os.cpu_count() or 1
+
+
+class HashingReader(io.RawIOBase):
+    """
+    a file which computes the SHA-256 of its contents as it is read, so that an input
+    can be hashed and parsed in one pass. when it is closed, anything the parser did
+    not read is hashed too, and `on_close(fname, sha256)` is called.
+    """
+
+    def __init__(self, fname, on_close=None):
+        self.fname = fname
+        self.sha256 = None
+        self._fd = open(fname, "rb", buffering=0)
+        self._hash = hashlib.sha256()
+        self._on_close = on_close
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._fd.readinto(b)
+        if n:
+            self._hash.update(memoryview(b)[:n])
+        return n
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            while True:
+                data = self._fd.read(CHUNK_SIZE)
+                if not data:
+                    break
+                self._hash.update(data)
+            self.sha256 = self._hash.hexdigest()
+        finally:
+            self._fd.close()
+            super().close()
+        if self._on_close is not None:
+            self._on_close(self.fname, self.sha256)
+
+
+def open_hashed(fname, mode="r", on_close=None, encoding=None):
+    "like `open`, for reading only, through a `HashingReader`"
+    fd = io.BufferedReader(HashingReader(fname, on_close), CHUNK_SIZE)
+    if mode == "rb":
+        return fd
+    if mode == "r":
+        return io.TextIOWrapper(fd, encoding=encoding)
+    raise ValueError("unsupported mode: {}".format(mode))
+
+
+def sha256_file(fname):
+    h = hashlib.sha256()
+    with open(fname, "rb") as fd:
+        while True:
+            data = fd.read(CHUNK_SIZE)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+
+def sha256_files(fnames, workers=HASH_WORKERS):
+    "the SHA-256 of each file, by filename, hashing several files at a time"
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(fnames, executor.map(sha256_file, fnames)))
@@ -0,0 +1,64 @@
+from exegete.text.library.schema import v1
+from .parallel import DEFAULT_WORKERS
+
+
+def add_load_arguments(parser):
+    "command line options controlling how a module is loaded into the database"
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=v1.Module.DEFAULT_BATCH_SIZE,
+        help="number of objects to load into the database at a time",
+    )
+    parser.add_argument(
+        "--maintenance-work-mem",
+        help="PostgreSQL maintenance_work_mem for building indexes, e.g. 1GB",
+    )
+    parser.add_argument(
+        "--no-defer-indexes",
+        dest="defer_indexes",
+        action="store_false",
+        help="maintain indexes while loading, rather than building them at the end",
+    )
+    parser.add_argument(
+        "--validate-every",
+        type=int,
+        default=1,
+        metavar="N",
+        help="validate only every Nth object against the schema (0: none)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="ingest the module even if its input files are unchanged",
+    )
+
+
+def add_worker_arguments(parser):
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of processes parsing books in parallel",
+    )
+
+
+def load_options(args):
+    return {
+        "batch_size": args.batch_size,
+        "maintenance_work_mem": args.maintenance_work_mem,
+        "defer_indexes": args.defer_indexes,
+        "validate_every": args.validate_every,
+    }
+
+
+def unchanged(manager, shortcode, path, fnames, force=False):
+    """
+    whether the current version of the module was built from the same input files,
+    in which case there is nothing to ingest
+    """
+    if force or not manager.is_current(v1.Module, shortcode, path, fnames):
+        return False
+    manager.unlock_module(shortcode)
+    print("{}: input files unchanged, nothing to ingest".format(shortcode))
+    return True
@@ -1,6 +1,14 @@
 from exegete.text.library.schema import v1
+from exegete.text.ingest import (
+    add_load_arguments,
+    add_worker_arguments,
+    load_options,
+    unchanged,
+)
+from exegete.text.ingest.parallel import DEFAULT_WORKERS, load_books
 from exegete.text.library import Manager
 from exegete.text.cleanup import clean_words, introduce_spaces
+from exegete.text.hashing import open_hashed
 import argparse
 from glob import glob
 from lxml import etree
@@ -10,8 +18,178 @@ import os
 import json
 
 
-def netbible_ingest(path):
+STRONGS_RE = re.compile(r"^\d+[b]?$")
+
+# marks the element wrapping each hunk of a chapter, when they are parsed together
+HUNK_ATTRIBUTE = "data-exegete-hunk"
+
+
+def load_chapter(fname):
+    "runs in a worker process"
+    inputs = {}
+    with open_hashed(fname, on_close=inputs.__setitem__) as fd:
+        text = json.load(fd)
+    return list(chapter_objects(text)), inputs
+
+
+def element_fragments(elem, attrs):
+    """
+    yields the text of `elem` as fragments for `clean_words`. `attrs` is shared by
+    the fragments, and the elements within `elem`, unless an element adds to it: then
+    it is copied for that element, so it is never modified.
+    """
+    tag = elem.tag
+    if tag == "st":
+        codes = []
+        for code in elem.get("data-num").strip().split(" "):
+            assert STRONGS_RE.match(code)
+            codes.append(code)
+        attrs = {**attrs, "c-strongs": codes}
+    elif tag == "span":
+        class_text = elem.get("class")
+        if class_text:
+            for cls in class_text.strip().split(" "):
+                if cls == "hebrew":
+                    attrs = {**attrs, "language": "hbo"}
+                elif cls == "smcaps":
+                    pass
+                else:
+                    raise Exception(cls)
+    elif tag == "p":
+        class_text = elem.get("class")
+        if class_text:
+            for cls in class_text.strip().split(" "):
+                if (
+                    cls == "bodytext"
+                    or cls == "bodyblock"
+                    or cls == "paragraphtitle"
+                    or cls == "psasuper"  # prelude for a Psalm
+                    or cls
+                    == "lamhebrew"  # ignore as there'll be a <span class="hebrew">..</span>
+                    or cls
+                    == "sosspeaker"  # ignore as <strong>...</strong> also present
+                    or cls == "poetry"
+                    or cls == "poetrybreak"
+                    or cls == "otpoetry"
+                    or cls == "quote"
+                ):
+                    pass
+                else:
+                    raise Exception(cls)
+    # html and body are put in by LXML
+    elif tag in ("html", "body", "b", "i", "sup"):
+        pass
+    elif tag == "n":
+        # skip footnotes, they are not included in the free version of the NET Bible
+        return
+    elif tag == "br":
+        return
+    else:
+        raise Exception((elem, type(elem)))
+    yield from content_fragments(elem, attrs)
+
+
+def content_fragments(elem, attrs):
+    "the fragments of the text and elements within `elem`"
+    if elem.text:
+        yield {**attrs, "value": introduce_spaces(elem.text)}
+    for child in elem:
+        yield from element_fragments(child, attrs)
+        # the text following the child is part of `elem`
+        if child.tail:
+            yield {**attrs, "value": introduce_spaces(child.tail)}
+
+
+def parse_hunks(hunks, parser):
+    """
+    parse the marked up text of every hunk of a chapter in one go, each wrapped in a
+    div, and return the wrappers. returns None if the markup of any hunk has broken
+    out of its wrapper: then the hunks must be parsed one at a time.
+    """
+    doc = "".join(
+        '<div {}="{}">{}</div>'.format(HUNK_ATTRIBUTE, idx, hunk["text"])
+        for idx, hunk in enumerate(hunks)
+    )
+    if not doc:
+        return []
+    root = etree.fromstring(doc, parser)
+    if root.text or len(root) != 1 or root[0].tag != "body":
+        return None
+    body = root[0]
+    if body.text or body.tail or len(body) != len(hunks):
+        return None
+    for idx, (wrapper, hunk) in enumerate(zip(body, hunks)):
+        if (
+            wrapper.tag != "div"
+            or wrapper.get(HUNK_ATTRIBUTE) != str(idx)
+            or wrapper.tail
+            # the per-hunk parse rejects blank markup, so leave it to report the error
+            or (
+                hunk["text"] != ""
+                and not (wrapper.text or "").strip()
+                and len(wrapper) == 0
+            )
+        ):
+            return None
+    return list(body)
+
+
+def hunk_fragments(hunk, wrapper, parser):
+    "the fragments of a hunk, from its wrapper or parsed on its own"
+    if wrapper is not None:
+        yield from content_fragments(wrapper, {})
+        return
+    if hunk["text"] == "":
+        # Acts 24:7 ruins everything
+        return
+    et = etree.parse(StringIO(hunk["text"]), parser)
+    nodes = et.xpath("/child::node()")
+    if len(nodes) == 0:
+        raise Exception([hunk, nodes, len(nodes)])
+    for node in nodes:
+        yield from element_fragments(node, {})
+
+
+def chapter_objects(text):
+    parser = etree.HTMLParser()
+
+    # each file is a chapter, consisting of a list of (chapter, verse) addressed hunks of marked up text
+    wrappers = parse_hunks(text, parser)
+    if wrappers is None:
+        wrappers = [None] * len(text)
+
+    for hunk, wrapper in zip(text, wrappers):
+        # exegete requires words to really be words, not multiple words, and not containing whitespace.
+        # (we are focussed upon exegesis/analysis, not presentation)
+        try:
+            words = clean_words(hunk_fragments(hunk, wrapper, parser), stem=True)
+        except Exception as e:
+            print(hunk)
+            raise e
+
+        yield {
+            "type": "verse",
+            "chapter_start": int(hunk["chapter"]),
+            "chapter_end": int(hunk["chapter"]),
+            "verse_start": int(hunk["verse"]),
+            "verse_end": int(hunk["verse"]),
+            "text": words,
+        }
+
+
+def chapter_files(path):
+    "every chapter of the NET Bible, in canonical order"
+    return [
+        fname
+        for division in ("ot", "nt")
+        for fname in sorted(glob(os.path.join(path, division, "*", "*.json")))
+    ]
+
+
+def netbible_ingest(path, workers=DEFAULT_WORKERS, force=False, **load_options):
     manager = Manager()
+    if unchanged(manager, "NET", path, chapter_files(path), force):
+        return
     mod = manager.create_module(
         v1.Module,
         type=v1.ModuleType.bible,
@@ -59,6 +237,7 @@ You can download it at https://bible.org/downloads
         url="https://netbible.com",
         description="The NET is the newest complete translation of the original biblical languages into English. In the mid-1990s, a multi-denominational team of more than twenty-five of the world’s foremost biblical scholars gathered around the shared vision of creating an English Bible translation that could overcome old challenges and boldly open the door for new possibilities. With the first edition completed in 2001, ongoing revisions based on scholarly and user feedback in 2003 and 2005, and a major update reaching its final stages in 2019, the NET’s unique translation process has yielded a beautiful, faithful English Bible for the worldwide church today.",
     )
+    mod.set_load_options(**load_options)
 
     def make_books():
         # define the books of the NET Bible
@@ -79,154 +258,27 @@ You can download it at https://bible.org/downloads
                 book_id += 1
         return dir_id
 
-    def load_book(fname):
-        with mod.open_and_log(fname, path) as fd:
-            text = json.load(fd)
-
-        strongs_re = re.compile(r"^\d+[b]?$")
-        parser = etree.HTMLParser()
-
-        def process_node(node, attrs: dict, object_attrs: dict):
-            typ = type(node)
-
-            def process_children_with_attrs(extra):
-                agg = []
-                for words in [
-                    process_node(t, attrs | extra, object_attrs)
-                    for t in node.xpath("./child::node()")
-                ]:
-                    agg += words
-                return agg
-
-            if typ is etree._ElementUnicodeResult or typ is str:
-                text = str(node)
-                text_attrs = {"value": introduce_spaces(text)}
-                return [attrs | text_attrs]
-
-            if typ is etree._Element and node.tag == "st":
-                codes = []
-                for code in node.get("data-num").strip().split(" "):
-                    assert strongs_re.match(code)
-                    codes.append("{}".format(code))
-                return process_children_with_attrs({"c-strongs": codes})
-
-            # these are put in by LXML
-            if typ is etree._Element and node.tag in ("html", "body"):
-                return process_children_with_attrs({})
-
-            if typ is etree._Element and node.tag == "p":
-                class_text = node.get("class")
-                if class_text:
-                    classes = class_text.strip().split(" ")
-                    for cls in classes:
-                        if (
-                            cls == "bodytext"
-                            or cls == "bodyblock"
-                            or cls == "paragraphtitle"
-                            or cls == "psasuper"  # prelude for a Psalm
-                            or cls
-                            == "lamhebrew"  # ignore as there'll be a <span class="hebrew">..</span>
-                            or cls
-                            == "sosspeaker"  # ignore as <strong>...</strong> also present
-                            or cls == "poetry"
-                            or cls == "poetrybreak"
-                            or cls == "otpoetry"
-                            or cls == "quote"
-                        ):
-                            pass
-                        else:
-                            raise Exception(cls)
-                # insert some whitespace for the <p>
-                return process_children_with_attrs({})
-
-            if typ is etree._Element and node.tag == "span":
-                span_attrs = {}
-                class_text = node.get("class")
-                if class_text:
-                    classes = class_text.strip().split(" ")
-                    for cls in classes:
-                        if cls == "hebrew":
-                            span_attrs["language"] = "hbo"
-                        elif cls == "smcaps":
-                            pass
-                        else:
-                            raise Exception(cls)
-                return process_children_with_attrs(span_attrs)
-
-            if typ is etree._Element and node.tag == "b":
-                return process_children_with_attrs({})
-
-            if typ is etree._Element and node.tag == "i":
-                return process_children_with_attrs({})
-
-            if typ is etree._Element and node.tag == "sup":
-                return process_children_with_attrs({})
-
-            if typ is etree._Element and node.tag == "n":
-                # skip footnotes, they are not included in the free version of the NET Bible
-                return []
-
-            if typ is etree._Element and node.tag == "br":
-                return []
-
-            raise Exception((node, type(node)))
-
-        # each file is a chapter, consisting of a list of (chapter, verse) addressed hunks of marked up text
-        for hunk in text:
-            if hunk["text"] != "":
-                et = etree.parse(StringIO(hunk["text"]), parser)
-                nodes = et.xpath("/child::node()")
-                if len(nodes) == 0:
-                    raise Exception([hunk, nodes, len(nodes)])
-            else:
-                # Acts 24:7 ruins everything
-                nodes = [""]
-
-            # object level attributes such as the poetry flag; these are scoped to the whole object, not
-            # particular words
-            words = []
-            object_attrs = {}
-            for node in nodes:
-                try:
-                    words += process_node(node, {}, object_attrs)
-                except Exception as e:
-                    print(node)
-                    raise e
-            assert all(isinstance(t, dict) for t in words)
-
-            # exegete requires words to really be words, not multiple words, and not containing whitespace.
-            # (we are focussed upon exegesis/analysis, not presentation)
-            words = clean_words(words, stem=True)
-
-            yield {
-                "type": "verse",
-                "chapter_start": int(hunk["chapter"]),
-                "chapter_end": int(hunk["chapter"]),
-                "verse_start": int(hunk["verse"]),
-                "verse_end": int(hunk["verse"]),
-                "text": words,
-            }
-
-    def load_books(dir_id):
+    def chapter_tasks(dir_id):
         for division in ("ot", "nt"):
             for bookdir in sorted(glob(os.path.join(path, division, "*/"))):
                 book_id = dir_id[bookdir]
-                linear_id = 0
                 for fname in sorted(glob(os.path.join(bookdir, "*.json"))):
-                    linear_id = mod.import_book_stream(
-                        linear_id, book_id, load_book(fname)
-                    )
+                    yield book_id, load_chapter, (fname,)
 
     dir_id = make_books()
-    load_books(dir_id)
+    load_books(mod, path, chapter_tasks(dir_id), workers)
     mod.complete()
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("path")
+    add_load_arguments(parser)
+    add_worker_arguments(parser)
     args = parser.parse_args()
-    netbible_ingest(args.path)
+    netbible_ingest(
+        args.path, workers=args.workers, force=args.force, **load_options(args)
+    )
 
 
 if __name__ == "__main__":
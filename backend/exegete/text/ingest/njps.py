@@ -5,6 +5,14 @@ from io import StringIO
 from exegete.text.cleanup import clean_words, introduce_spaces
 from exegete.text.library import Manager
 from exegete.text.library.schema import v1
+from exegete.text.hashing import open_hashed
+from exegete.text.ingest import (
+    add_load_arguments,
+    add_worker_arguments,
+    load_options,
+    unchanged,
+)
+from exegete.text.ingest.parallel import DEFAULT_WORKERS, load_books
 from lxml import etree
 import json
 import argparse
@@ -173,8 +181,54 @@ def download(path):
             print("downloaded:", book)
 
 
-def njps_ingest(path):
+def load_book(json_file):
+    "runs in a worker process"
+    inputs = {}
+    with open_hashed(json_file, on_close=inputs.__setitem__) as fd:
+        data = json.load(fd)
+
+    print(json_file)
+    return list(book_objects(json_file, data)), inputs
+
+
+def book_objects(json_file, data):
+    for chapter, chapter_data in enumerate(data["text"], 1):
+        for verse, text in enumerate(chapter_data, 1):
+            try:
+                verse_text, footnotes = sefaria_parse(text)
+            except Exception:
+                print(json_file, chapter, verse, repr(text))
+                raise
+            if verse_text is not None:
+                yield {
+                    "type": "verse",
+                    "chapter_start": chapter,
+                    "chapter_end": chapter,
+                    "verse_start": verse,
+                    "verse_end": verse,
+                    "text": clean_words([{"value": verse_text}], stem=True),
+                }
+            for footnote in footnotes:
+                yield {
+                    "type": "footnote",
+                    "chapter_start": chapter,
+                    "chapter_end": chapter,
+                    "verse_start": verse,
+                    "verse_end": verse,
+                    "text": clean_words([{"value": footnote}], stem=True),
+                }
+
+
+def input_files(path):
+    return [
+        fname(path, grouping, book) for grouping in books for book in books[grouping]
+    ]
+
+
+def njps_ingest(path, workers=DEFAULT_WORKERS, force=False, **load_options):
     manager = Manager()
+    if unchanged(manager, "NJPS", path, input_files(path), force):
+        return
     mod = manager.create_module(
         v1.Module,
         type=v1.ModuleType.bible,
@@ -195,6 +249,7 @@ Not since the third century b.c.e., when 72 elders of the tribes of Israel creat
 
 In executing this monumental task, the translators made use of the entire range of biblical interpretation, ancient and modern, Jewish and non-Jewish. They drew upon the latest findings in linguistics and archaeology, as well as the work of early rabbinic and medieval commentators, grammarians, and philologians. The resulting text is a triumph of literary style and biblical scholarship, unsurpassed in accuracy and clarity.""",
     )
+    mod.set_load_options(**load_options)
 
     # Sefaria's names differ a bit from SBL standard
     fix_names = {
@@ -219,57 +274,26 @@ In executing this monumental task, the translators made use of the entire range
                 )
         return book_to_id
 
-    def load_book(json_file):
-        with open(json_file) as fd:
-            data = json.load(fd)
-
-        print(json_file)
-        for chapter, chapter_data in enumerate(data["text"], 1):
-            for verse, text in enumerate(chapter_data, 1):
-                try:
-                    verse_text, footnotes = sefaria_parse(text)
-                except Exception:
-                    print(json_file, chapter, verse, repr(text))
-                    raise
-                if verse_text is not None:
-                    yield {
-                        "type": "verse",
-                        "chapter_start": chapter,
-                        "chapter_end": chapter,
-                        "verse_start": verse,
-                        "verse_end": verse,
-                        "text": clean_words([{"value": verse_text}], stem=True),
-                    }
-                for footnote in footnotes:
-                    yield {
-                        "type": "footnote",
-                        "chapter_start": chapter,
-                        "chapter_end": chapter,
-                        "verse_start": verse,
-                        "verse_end": verse,
-                        "text": clean_words([{"value": footnote}], stem=True),
-                    }
-
-    def load_books():
+    def book_tasks():
         for grouping in books:
             for book in books[grouping]:
-                json_file = fname(path, grouping, book)
-                book_id = book_to_id[book]
-                load_book(json_file)
-                mod.import_book_stream(0, book_id, load_book(json_file))
+                yield book_to_id[book], load_book, (fname(path, grouping, book),)
 
     book_to_id = make_books()
-    load_books()
+    load_books(mod, path, book_tasks(), workers)
+    mod.complete()
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("path")
+    add_load_arguments(parser)
+    add_worker_arguments(parser)
     parser.add_argument("--download", action="store_true")
     args = parser.parse_args()
     if args.download:
         download(args.path)
-    njps_ingest(args.path)
+    njps_ingest(args.path, workers=args.workers, force=args.force, **load_options(args))
 
 
 if __name__ == "__main__":
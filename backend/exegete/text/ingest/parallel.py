@@ -0,0 +1,69 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+from .pipeline import Pipeline
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def run_in_order(tasks, workers):
+    """
+    run each task `(fn, args)` in a pool of worker processes, yielding the results in
+    the order of the tasks. `fn` must be picklable, so a module-level function.
+    """
+    if workers <= 1:
+        for fn, args in tasks:
+            yield fn(*args)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for fn, args in tasks:
+            pending.append(executor.submit(fn, *args))
+            # bound the number of parsed books held waiting for the writer
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def load_books(mod, path, tasks, workers=DEFAULT_WORKERS):
+    """
+    parse books in parallel, and load them into `mod` from this process in order.
+    parsing, validation and loading are stages of a `Pipeline`.
+
+    `tasks` is an iterable of `(book_id, fn, args)` in canonical order, where `fn(*args)`
+    returns `(objects, inputs)`: a list of the objects in a book, or in part of a book,
+    and a dict of the SHA-256 of each input file the worker read, by filename (see
+    `open_hashed`). these are recorded as inputs of `mod`, relative to `path`. a book
+    may be split over several consecutive tasks: its `linear_id` carries on from one
+    to the next.
+    """
+    book_ids = deque()
+
+    def parse_tasks():
+        for book_id, fn, args in tasks:
+            book_ids.append(book_id)
+            yield fn, args
+
+    def parse():
+        for objects, inputs in run_in_order(parse_tasks(), workers):
+            for fname, sha256 in inputs.items():
+                mod.record_input(fname, path, sha256)
+            yield book_ids.popleft(), objects
+
+    def validate(books):
+        linear_ids = {}
+
+        def rows():
+            for book_id, objects in books:
+                linear_id = linear_ids.get(book_id, 0)
+                yield from mod.object_rows(linear_id, book_id, objects)
+                linear_ids[book_id] = linear_id + len(objects)
+
+        return mod.batches(rows())
+
+    pipeline = Pipeline(
+        ("parse", parse()), ("validate", validate), ("write", mod.load_batches)
+    )
+    pipeline.run()
+    pipeline.report()
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+
+# the number of items which may be waiting between two stages
+QUEUE_SIZE = 8
+
+# marks the end of a stage's output
+DONE = object()
+
+
+class PipelineAborted(Exception):
+    "another stage of the pipeline failed"
+
+
+class Stage:
+    "timing counters for a stage of a pipeline"
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.elapsed = 0.0
+        # waiting for the previous stage
+        self.waiting = 0.0
+        # waiting for the next stage to make room (backpressure)
+        self.blocked = 0.0
+
+    @property
+    def busy(self):
+        return self.elapsed - self.waiting - self.blocked
+
+    def report(self):
+        return "{}: {} items in {:.1f}s ({:.1f}/s busy); {:.1f}s waiting for input, {:.1f}s blocked on output".format(
+            self.name,
+            self.items,
+            self.elapsed,
+            self.items / self.busy if self.busy > 0 else 0,
+            self.waiting,
+            self.blocked,
+        )
+
+
+class Pipeline:
+    """
+    a pipeline of stages, each on its own thread, connected by bounded queues. a
+    stage which gets ahead blocks until the next stage catches up, so the memory
+    used by the items in flight is capped.
+
+    `source` is (name, iterable). each stage is (name, fn), where `fn` takes an
+    iterator over the output of the previous stage, and returns an iterable of its
+    own output. the last stage runs on the calling thread, and its output is
+    discarded.
+    """
+
+    def __init__(self, source, *stages, queue_size=QUEUE_SIZE):
+        self._source = source
+        self._stages = stages
+        self._queue_size = queue_size
+        self._abort = threading.Event()
+        self._errors = []
+        self.stages = []
+
+    def _put(self, stage, q, item):
+        started = time.monotonic()
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        stage.blocked += time.monotonic() - started
+
+    def _get_all(self, stage, q):
+        while True:
+            started = time.monotonic()
+            while True:
+                if self._abort.is_set():
+                    raise PipelineAborted()
+                try:
+                    item = q.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    pass
+            stage.waiting += time.monotonic() - started
+            if item is DONE:
+                return
+            yield item
+
+    def _run_stage(self, stage, items, out):
+        started = time.monotonic()
+        try:
+            for item in items:
+                stage.items += 1
+                self._put(stage, out, item)
+            self._put(stage, out, DONE)
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._abort.set()
+        finally:
+            stage.elapsed = time.monotonic() - started
+
+    def run(self):
+        name, source = self._source
+        stage = Stage(name)
+        self.stages.append(stage)
+        out = queue.Queue(maxsize=self._queue_size)
+        threads = [
+            threading.Thread(
+                target=self._run_stage, args=(stage, iter(source), out), daemon=True
+            )
+        ]
+        for name, fn in self._stages[:-1]:
+            stage = Stage(name)
+            self.stages.append(stage)
+            items, out = self._get_all(stage, out), queue.Queue(self._queue_size)
+            threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(stage, fn(items), out),
+                    daemon=True,
+                )
+            )
+        for thread in threads:
+            thread.start()
+
+        name, fn = self._stages[-1]
+        stage = Stage(name)
+        self.stages.append(stage)
+        started = time.monotonic()
+        try:
+            for _ in fn(self._get_all(stage, out)):
+                stage.items += 1
+        except PipelineAborted:
+            pass
+        except BaseException as e:
+            self._errors.append(e)
+            self._abort.set()
+        finally:
+            stage.elapsed = time.monotonic() - started
+        for thread in threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def report(self):
+        for stage in self.stages:
+            print(stage.report())
@@ -5,11 +5,182 @@ from exegete.text import one
 from exegete.text.cleanup import clean_words
 from exegete.text.library import Manager
 from exegete.text.library.schema import v1
+from exegete.text.ingest import (
+    add_load_arguments,
+    add_worker_arguments,
+    load_options,
+    unchanged,
+)
+from exegete.text.ingest.parallel import DEFAULT_WORKERS, load_books
 from lxml import etree
 
 
-def sblgnt_ingest(path):
+def parse_verse_id(s):
+    book, chapter_verse = s.rsplit(" ", 1)
+    chapter, verse = chapter_verse.rsplit(":", 1)
+    # the verse might have a range
+    if "-" in verse:
+        verse_start, verse_end = verse.split("-")
+    else:
+        verse_start = verse_end = verse
+    return book, int(chapter), int(verse_start), int(verse_end)
+
+
+def iter_books(fd):
+    """
+    yields each book of the document as soon as it has been parsed. each book is
+    freed once the next has been parsed, so only one is held in memory.
+    """
+    for _, book_elem in etree.iterparse(fd, tag="book"):
+        yield book_elem
+        book_elem.clear()
+        while book_elem.getprevious() is not None:
+            del book_elem.getparent()[0]
+
+
+def book_title(book_elem):
+    return one(one(book_elem.xpath("./title")).xpath("./text()"))
+
+
+def load_apparatus(book_elem, book_id):
+    "the footnotes of a book, by (book_id, chapter, verse_end)"
+    apparatus = defaultdict(list)
+
+    def make_words(nodes, attrs):
+        buf = []
+        for t in nodes:
+            typ = type(t)
+            if typ is etree._ElementUnicodeResult or typ is str:
+                text = str(t)
+                buf.append(attrs | {"value": text})
+            elif typ is etree._Element and t.tag == "b":
+                buf += clean_words(make_words(t.xpath("./child::node()"), attrs))
+            else:
+                raise Exception([t, typ])
+        return buf
+
+    def handle_p(p_node):
+        # each `p` should be a footnote starting with a verse number
+        nodes = p_node.xpath("./child::node()")
+        assert nodes[0].tag == "verse-number"
+        _, chapter, verse_start, verse_end = parse_verse_id(nodes[0].get("id"))
+        apparatus[(book_id, chapter, verse_end)].append(
+            {
+                "type": "footnote",
+                "chapter_start": chapter,
+                "chapter_end": chapter,
+                "verse_start": verse_start,
+                "verse_end": verse_end,
+                "text": clean_words(make_words(nodes[1:], {})),
+            }
+        )
+
+    for node in book_elem.xpath("./*"):
+        if node.tag == "title":
+            pass
+        elif node.tag == "p":
+            handle_p(node)
+        else:
+            raise Exception(node)
+
+    return apparatus
+
+
+def load_book(book_xml, book_id, apparatus_xml):
+    "runs in a worker process"
+    apparatus = {}
+    if apparatus_xml is not None:
+        apparatus = load_apparatus(etree.fromstring(apparatus_xml), book_id)
+    # the input files are read, and hashed, by the parent process
+    return list(book_objects(etree.fromstring(book_xml), book_id, apparatus)), {}
+
+
+def book_objects(book_elem, book_id, apparatus):
+    def verse_state_nonempty(verse_state):
+        return any(verse_state[t] for t in ("chapter", "verse_start", "words"))
+
+    def verse_state_blank():
+        return {
+            "chapter": None,
+            "verse_start": None,
+            "verse_end": None,
+            "words": [],
+        }
+
+    def state_to_verse_and_footnotes(verse_state):
+        obj = {"type": "verse", "text": clean_words(verse_state["words"])}
+
+        # the shorter ending of Mark hasn't got a chapter or verse address
+        if verse_state["chapter"] is not None:
+            obj["chapter_start"] = obj["chapter_end"] = verse_state["chapter"]
+        if verse_state["verse_start"] is not None:
+            obj["verse_start"] = verse_state["verse_start"]
+        if verse_state["verse_end"] is not None:
+            obj["verse_end"] = verse_state["verse_end"]
+        yield obj
+        # look up any footnotes
+        footnote_key = (book_id, obj.get("chapter_end"), obj.get("verse_end"))
+        if footnote_key in apparatus:
+            yield from apparatus.pop(footnote_key)
+
+    def handle_p(p_node, verse_state):
+        # if we have a current verse, insert a whitespace word into the
+        # word stream for the <p> that just started
+        if verse_state_nonempty(verse_state):
+            verse_state["words"].append({"value": " "})
+
+        for node in p_node.xpath("./*"):
+            assert len(node.xpath("./*")) == 0
+            if node.tag == "verse-number":
+                if verse_state_nonempty(verse_state):
+                    yield from state_to_verse_and_footnotes(verse_state)
+                verse_state = verse_state_blank()
+                (
+                    _,
+                    verse_state["chapter"],
+                    verse_state["verse_start"],
+                    verse_state["verse_end"],
+                ) = parse_verse_id(node.get("id"))
+            elif node.tag == "w":
+                verse_state["words"].append({"value": "".join(node.xpath("./text()"))})
+            elif node.tag == "prefix":
+                verse_state["words"].append(
+                    {
+                        "value": "".join(node.xpath("./text()")),
+                    }
+                )
+            elif node.tag == "suffix":
+                verse_state["words"].append(
+                    {
+                        "value": "".join(node.xpath("./text()")),
+                    }
+                )
+            else:
+                raise Exception(node)
+        return verse_state
+
+    verse_state = verse_state_blank()
+    for node in book_elem.xpath("./*"):
+        if node.tag == "title" or node.tag == "mark-end":
+            if verse_state_nonempty(verse_state):
+                yield from state_to_verse_and_footnotes(verse_state)
+            verse_state = verse_state_blank()
+            yield {
+                "type": "title",
+                "text": clean_words([{"value": "".join(node.xpath(".//text()"))}]),
+            }
+        elif node.tag == "p":
+            verse_state = yield from handle_p(node, verse_state)
+        else:
+            raise Exception(node)
+
+
+def sblgnt_ingest(path, workers=DEFAULT_WORKERS, force=False, **load_options):
+    gnt_fname = os.path.join(path, "sblgnt.xml")
+    app_fname = os.path.join(path, "sblgntapp.xml")
     manager = Manager()
+    if unchanged(manager, "SBLGNT", path, [gnt_fname, app_fname], force):
+        return
     mod = manager.create_module(
         v1.Module,
         type=v1.ModuleType.bible,
@@ -46,179 +217,54 @@ The SBLGNT may not be used in a Greek-English diglot without a license, regardle
         url="https://sblgnt.com",
         description="Logos Bible Software and the Society of Biblical Literature are pleased to announce the release of a new, critically edited Greek New Testament.",
     )
-
-    def get_gnt_etree():
-        with mod.open_and_log(os.path.join(path, "sblgnt.xml"), path) as fd:
-            return etree.parse(fd)
-
-    def get_gntapp_etree():
-        with mod.open_and_log(os.path.join(path, "sblgntapp.xml"), path) as fd:
-            return etree.parse(fd)
-
-    def make_books():
-        et = get_gnt_etree()
-        title_id = {}
-        for book_id, book_elem in enumerate(et.xpath("/sblgnt/book")):
-            first_verse = book_elem.xpath("./p/verse-number")[0]
-            long_name = str(first_verse.get("id")).rsplit(" ", 1)[0].strip()
-            mod.add_book(id=book_id, division=v1.Division.new_testament, name=long_name)
-            title = one(book_elem.xpath("./title"))
-            title_id[one(title.xpath("./text()"))] = book_id
-        return title_id
-
-    def parse_verse_id(s):
-        book, chapter_verse = s.rsplit(" ", 1)
-        chapter, verse = chapter_verse.rsplit(":", 1)
-        # the verse might have a range
-        if "-" in verse:
-            verse_start, verse_end = verse.split("-")
-        else:
-            verse_start = verse_end = verse
-        return book, int(chapter), int(verse_start), int(verse_end)
-
-    def load_book(book_elem, book_id, apparatus):
-        def verse_state_nonempty(verse_state):
-            return any(verse_state[t] for t in ("chapter", "verse_start", "words"))
-
-        def verse_state_blank():
-            return {
-                "chapter": None,
-                "verse_start": None,
-                "verse_end": None,
-                "words": [],
-            }
-
-        def state_to_verse_and_footnotes(verse_state):
-            obj = {"type": "verse", "text": clean_words(verse_state["words"])}
-
-            # the shorter ending of Mark hasn't got a chapter or verse address
-            if verse_state["chapter"] is not None:
-                obj["chapter_start"] = obj["chapter_end"] = verse_state["chapter"]
-            if verse_state["verse_start"] is not None:
-                obj["verse_start"] = verse_state["verse_start"]
-            if verse_state["verse_end"] is not None:
-                obj["verse_end"] = verse_state["verse_end"]
-            yield obj
-            # look up any footnotes
-            footnote_key = (book_id, obj.get("chapter_end"), obj.get("verse_end"))
-            if footnote_key in apparatus:
-                yield from apparatus.pop(footnote_key)
-
-        def handle_p(p_node, verse_state):
-            # if we have a current verse, insert a whitespace word into the
-            # word stream for the <p> that just started
-            if verse_state_nonempty(verse_state):
-                verse_state["words"].append({"value": " "})
-
-            for node in p_node.xpath("./*"):
-                assert len(node.xpath("./*")) == 0
-                if node.tag == "verse-number":
-                    if verse_state_nonempty(verse_state):
-                        yield from state_to_verse_and_footnotes(verse_state)
-                    verse_state = verse_state_blank()
-                    (
-                        _,
-                        verse_state["chapter"],
-                        verse_state["verse_start"],
-                        verse_state["verse_end"],
-                    ) = parse_verse_id(node.get("id"))
-                elif node.tag == "w":
-                    verse_state["words"].append(
-                        {"value": "".join(node.xpath("./text()"))}
-                    )
-                elif node.tag == "prefix":
-                    verse_state["words"].append(
-                        {
-                            "value": "".join(node.xpath("./text()")),
-                        }
-                    )
-                elif node.tag == "suffix":
-                    verse_state["words"].append(
-                        {
-                            "value": "".join(node.xpath("./text()")),
-                        }
+    mod.set_load_options(**load_options)
+
+    def book_tasks():
+        with mod.open_and_log(gnt_fname, path, "rb") as gnt_fd, mod.open_and_log(
+            app_fname, path, "rb"
+        ) as app_fd:
+            # the apparatus is in canonical order too, so it is merged in as we go,
+            # but a book may not have any footnotes
+            app_books = iter_books(app_fd)
+            app_book = next(app_books, None)
+            for book_id, book_elem in enumerate(iter_books(gnt_fd)):
+                first_verse = book_elem.xpath("./p/verse-number")[0]
+                long_name = str(first_verse.get("id")).rsplit(" ", 1)[0].strip()
+                mod.add_book(
+                    id=book_id, division=v1.Division.new_testament, name=long_name
+                )
+                app_xml = None
+                if app_book is not None and book_title(app_book) == book_title(
+                    book_elem
+                ):
+                    app_xml = etree.tostring(app_book, with_tail=False)
+                    app_book = next(app_books, None)
+                # elements can't be sent to a worker, so each book is serialised
+                yield book_id, load_book, (
+                    etree.tostring(book_elem, with_tail=False),
+                    book_id,
+                    app_xml,
+                )
+            if app_book is not None:
+                raise Exception(
+                    "apparatus book not found, or out of order: {}".format(
+                        book_title(app_book)
                     )
-                else:
-                    raise Exception(node)
-            return verse_state
+                )
 
-        verse_state = verse_state_blank()
-        for node in book_elem.xpath("./*"):
-            if node.tag == "title" or node.tag == "mark-end":
-                if verse_state_nonempty(verse_state):
-                    yield from state_to_verse_and_footnotes(verse_state)
-                verse_state = verse_state_blank()
-                yield {
-                    "type": "title",
-                    "text": clean_words([{"value": "".join(node.xpath(".//text()"))}]),
-                }
-            elif node.tag == "p":
-                verse_state = yield from handle_p(node, verse_state)
-            else:
-                raise Exception(node)
-
-    def load_books(apparatus):
-        et = get_gnt_etree()
-        for book_id, book_elem in enumerate(et.xpath("/sblgnt/book")):
-            mod.import_book_stream(0, book_id, load_book(book_elem, book_id, apparatus))
-
-    def load_apparatus(title_id):
-        apparatus = defaultdict(list)
-
-        def make_words(nodes, attrs):
-            buf = []
-            for t in nodes:
-                typ = type(t)
-                if typ is etree._ElementUnicodeResult or typ is str:
-                    text = str(t)
-                    buf.append(attrs | {"value": text})
-                elif typ is etree._Element and t.tag == "b":
-                    buf += clean_words(make_words(t.xpath("./child::node()"), attrs))
-                else:
-                    raise Exception([t, typ])
-            return buf
-
-        def handle_p(book_id, p_node):
-            # each `p` should be a footnote starting with a verse number
-            nodes = p_node.xpath("./child::node()")
-            assert nodes[0].tag == "verse-number"
-            _, chapter, verse_start, verse_end = parse_verse_id(nodes[0].get("id"))
-            apparatus[(book_id, chapter, verse_end)].append(
-                {
-                    "type": "footnote",
-                    "chapter_start": chapter,
-                    "chapter_end": chapter,
-                    "verse_start": verse_start,
-                    "verse_end": verse_end,
-                    "text": clean_words(make_words(nodes[1:], {})),
-                }
-            )
-
-        et = get_gntapp_etree()
-        for book_elem in et.xpath("/sblgntapp/book"):
-            title = one(book_elem.xpath("./title"))
-            book_id = title_id[one(title.xpath("./text()"))]
-            for node in book_elem.xpath("./*"):
-                if node.tag == "title":
-                    pass
-                elif node.tag == "p":
-                    handle_p(book_id, node)
-                else:
-                    raise Exception(node)
-
-        return apparatus
-
-    title_id = make_books()
-    apparatus = load_apparatus(title_id)
-    load_books(apparatus)
+    load_books(mod, path, book_tasks(), workers)
     mod.complete()
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("path")
+    add_load_arguments(parser)
+    add_worker_arguments(parser)
     args = parser.parse_args()
-    sblgnt_ingest(args.path)
+    sblgnt_ingest(
+        args.path, workers=args.workers, force=args.force, **load_options(args)
+    )
 
 
 if __name__ == "__main__":
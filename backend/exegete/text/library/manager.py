@@ -1,9 +1,18 @@
+import redis
 import sqlalchemy
 import os
 from exegete.settings import settings
+from exegete.text.hashing import sha256_files
 from uuid import uuid4
-from sqlalchemy.schema import CreateSchema, MetaData
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.schema import CreateSchema, DropSchema, MetaData
 from typing import Callable, TypeVar
+from .registry import module_registry
+
+# a module's shortcode is published here when a new version of it is promoted, so
+# that the API reloads its catalog
+MODULES_CHANNEL = "modules:promoted"
 
 
 class Manager:
@@ -11,12 +20,15 @@ class Manager:
         self.engine = settings.create_sync_engine(
             echo="INGEST_DEBUG" in os.environ,
         )
+        # connections holding the ingest lock of a module, by shortcode
+        self._locks = {}
 
     ModuleInstance = TypeVar("ModuleInstance")
 
     def create_module(
         self, module_cls: Callable[[], ModuleInstance], **kwargs
     ) -> ModuleInstance:
+        self.lock_module(module_cls, kwargs["shortcode"])
         # the schema name is just a UUID with a prefix
         module_schema = (
             module_cls.SCHEMA_PREFIX + ":" + kwargs["shortcode"] + ":" + str(uuid4())
@@ -29,8 +41,15 @@ class Manager:
         metadata.create_all(self.engine)
         return module_cls.create(self, metadata, entities, **kwargs)
 
-    def list_modules(self, module_cls: Callable[[], ModuleInstance]) -> list:
-        inspector = sqlalchemy.inspect(self.engine)
+    @staticmethod
+    def schema_shortcode(schema_name: str) -> str:
+        return schema_name.split(":")[1]
+
+    def list_all_modules(
+        self, module_cls: Callable[[], ModuleInstance], conn=None
+    ) -> list:
+        "every version of every module, including those not (or no longer) current"
+        inspector = sqlalchemy.inspect(conn if conn is not None else self.engine)
         schemas = [
             t
             for t in inspector.get_schema_names()
@@ -38,6 +57,147 @@ class Manager:
         ]
         return schemas
 
+    def list_modules(self, module_cls: Callable[[], ModuleInstance]) -> list:
+        """
+        the current version of each module: the version in the registry, or every
+        completed version of a module which has never been promoted. a version which
+        is still being ingested (or whose ingest failed) is never current.
+        """
+        with self.engine.connect() as conn:
+            registered = dict(
+                conn.execute(
+                    select(module_registry.c.shortcode, module_registry.c.schema)
+                ).all()
+            )
+            schemas = []
+            for schema in self.list_all_modules(module_cls, conn):
+                shortcode = self.schema_shortcode(schema)
+                if shortcode in registered:
+                    if registered[shortcode] == schema:
+                        schemas.append(schema)
+                elif self.is_complete(module_cls, schema, conn):
+                    schemas.append(schema)
+        return schemas
+
+    def is_complete(
+        self, module_cls: Callable[[], ModuleInstance], schema_name: str, conn
+    ) -> bool:
+        "whether the ingest of this version of a module finished"
+        if not sqlalchemy.inspect(conn).has_table("module_info", schema=schema_name):
+            return False
+        module_info = self.module_entities(module_cls, schema_name)["module_info"]
+        # set by `Module.complete`, once the module has been loaded and indexed
+        input_sha256 = conn.execute(select(module_info.c.input_sha256)).scalar()
+        return input_sha256 is not None
+
+    def lock_module(self, module_cls: Callable[[], ModuleInstance], shortcode: str):
+        """
+        take the lock for ingesting a module, held until it is promoted (or this
+        process exits), so that only one version of a module is built at a time
+        """
+        if shortcode in self._locks:
+            return
+        key = func.hashtext(module_cls.SCHEMA_PREFIX + ":" + shortcode)
+        conn = self.engine.connect()
+        if not conn.execute(select(func.pg_try_advisory_lock(key))).scalar():
+            print("{}: waiting for another ingest to finish".format(shortcode))
+            conn.execute(select(func.pg_advisory_lock(key)))
+        # the lock belongs to the session, so the transaction needn't stay open
+        conn.commit()
+        self._locks[shortcode] = (conn, key)
+
+    def unlock_module(self, shortcode: str):
+        conn, key = self._locks.pop(shortcode)
+        conn.execute(select(func.pg_advisory_unlock(key)))
+        conn.commit()
+        conn.close()
+
+    def is_current(
+        self, module_cls: Callable[[], ModuleInstance], shortcode: str, path, fnames
+    ) -> bool:
+        """
+        whether the current version of a module was built from exactly the input
+        files `fnames`, by their SHA-256. takes the ingest lock of the module.
+        """
+        self.lock_module(module_cls, shortcode)
+        with self.engine.connect() as conn:
+            schema = conn.execute(
+                select(module_registry.c.schema).where(
+                    module_registry.c.shortcode == shortcode
+                )
+            ).scalar()
+            if schema is None:
+                return False
+            entities = self.module_entities(module_cls, schema)
+            module_info = entities["module_info"]
+            if conn.execute(select(module_info.c.input_sha256)).scalar() is None:
+                return False
+            input = entities["input"]
+            recorded = dict(
+                conn.execute(select(input.c.filename, input.c.sha256)).all()
+            )
+        # no need to read the files if they can't match
+        if set(recorded) != {os.path.relpath(fname, path) for fname in fnames}:
+            return False
+        return recorded == {
+            os.path.relpath(fname, path): sha256
+            for fname, sha256 in sha256_files(fnames).items()
+        }
+
+    def promote(
+        self, module_cls: Callable[[], ModuleInstance], schema_name: str, input_sha256
+    ):
+        """
+        make `schema_name` the current version of its module, in one transaction, and
+        drop the old versions. the version it replaces may still be in use, so that is
+        kept until the next promotion.
+        """
+        shortcode = self.schema_shortcode(schema_name)
+        with self.engine.begin() as conn:
+            current = conn.execute(
+                select(module_registry.c.schema)
+                .where(module_registry.c.shortcode == shortcode)
+                .with_for_update()
+            ).scalar()
+            versions = [
+                t
+                for t in self.list_all_modules(module_cls, conn)
+                if self.schema_shortcode(t) == shortcode and t != schema_name
+            ]
+            # before a module has been promoted, every version of it was in use
+            in_use = {current} if current is not None else set(versions)
+            stmt = insert(module_registry).values(
+                shortcode=shortcode, schema=schema_name, input_sha256=input_sha256
+            )
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[module_registry.c.shortcode],
+                    set_={
+                        "schema": stmt.excluded.schema,
+                        "input_sha256": stmt.excluded.input_sha256,
+                        "promoted": func.now(),
+                    },
+                )
+            )
+            for version in versions:
+                if version not in in_use:
+                    conn.execute(DropSchema(version, cascade=True))
+                    print("dropped old version: {}".format(version))
+        print("promoted: {}".format(schema_name))
+        self.notify_promoted(shortcode)
+        if shortcode in self._locks:
+            self.unlock_module(shortcode)
+
+    def notify_promoted(self, shortcode: str):
+        "tell the API, which will otherwise only see the new version when restarted"
+        client = redis.Redis.from_url(settings.redis_location)
+        try:
+            client.publish(MODULES_CHANNEL, shortcode)
+        except redis.RedisError as e:
+            print("could not notify the API of {}: {}".format(shortcode, e))
+        finally:
+            client.close()
+
     @staticmethod
     def module_entities(
         module_cls: Callable[[], ModuleInstance], schema_name: str
@@ -0,0 +1,21 @@
+from sqlalchemy import func
+from sqlalchemy.schema import Column, MetaData, Table
+from sqlalchemy.types import DateTime, String, Text
+
+metadata = MetaData()
+
+# the version of each module which is being served: a new version is built in a schema
+# of its own, alongside the current version, and then promoted by updating its row
+module_registry = Table(
+    "module_registry",
+    metadata,
+    Column("shortcode", Text, primary_key=True),
+    Column("schema", Text, nullable=False),
+    Column("input_sha256", String(64), nullable=True),
+    Column(
+        "promoted",
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    ),
+)
@@ -1,17 +1,22 @@
 from sqlalchemy import insert, Index, Enum, select, update
 from sqlalchemy.schema import Table, Column, MetaData, ForeignKey
+from sqlalchemy.schema import AddConstraint, CreateIndex, DropConstraint, DropIndex
 from sqlalchemy.sql.schema import UniqueConstraint
 from sqlalchemy.types import Text, DateTime, Integer, String
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.dialects.postgresql import REGCONFIG
-from sqlalchemy import func, literal, cast
-from jsonschema import validate
+from sqlalchemy import func, literal, cast, column, true
+from exegete.text.hashing import open_hashed
+from exegete.validation import CompiledSchema
 import jsonschema
 import hashlib
 import json
 import enum
+import io
 import os
+import threading
 import datetime
+import time
 from ..manager import Manager
 
 
@@ -49,8 +54,34 @@ class Division(enum.Enum):
     new_testament = "NT"
 
 
+def copy_text(value):
+    "encode a value for `COPY ... FROM STDIN` (text format)"
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
 class Module:
     SCHEMA_PREFIX = "ex_v1"
+    # the number of objects loaded into the database with each `COPY`
+    DEFAULT_BATCH_SIZE = 1000
+    COPY_COLUMNS = (
+        "book_id",
+        "chapter_start",
+        "verse_start",
+        "chapter_end",
+        "verse_end",
+        "type",
+        "linear_id",
+        "text",
+        "plaintext",
+    )
 
     @staticmethod
     def make_entities(metadata, schema_name):
@@ -119,7 +150,10 @@ class Module:
             ),  # this will monotonically increase in the book
             Column("text", JSONB, nullable=False),
             plaintext,
-            UniqueConstraint("book_id", "linear_id"),
+            # named as PostgreSQL would name it, so that it can be dropped and rebuilt
+            UniqueConstraint(
+                "book_id", "linear_id", name="object_book_id_linear_id_key"
+            ),
             Index(
                 "index_bi_cs_ce_vs_ve",
                 "book_id",
@@ -135,14 +169,128 @@ class Module:
             ),
         )
 
+        # concordance of Strong's numbers: each word tagged with a code, by its
+        # position within the text of its object
+        mkt(
+            "strongs",
+            Column("code", Text, nullable=False, primary_key=True),
+            Column(
+                "book_id",
+                ForeignKey(entities["book"].c.id),
+                nullable=False,
+                primary_key=True,
+            ),
+            Column("linear_id", Integer, nullable=False, primary_key=True),
+            Column("word", Integer, nullable=False, primary_key=True),
+        )
+
         return entities
 
+    @staticmethod
+    def build_concordance(conn, entities):
+        "populate the concordance from the module's objects, in a single statement"
+        object = entities["object"]
+        strongs = entities["strongs"]
+        words = (
+            func.jsonb_array_elements(object.c.text)
+            .table_valued(column("value", JSONB), with_ordinality="ordinality")
+            .render_derived()
+        )
+        codes = (
+            func.jsonb_array_elements_text(words.c.value.op("->")("c-strongs"))
+            .table_valued("value")
+            .render_derived()
+        )
+        conn.execute(
+            insert(strongs).from_select(
+                ["code", "book_id", "linear_id", "word"],
+                select(
+                    codes.c.value,
+                    object.c.book_id,
+                    object.c.linear_id,
+                    words.c.ordinality - 1,
+                )
+                .select_from(object)
+                .join(words, true())
+                .join(codes, true())
+                .distinct(),
+            )
+        )
+
     def __init__(self, manager: Manager, metadata: MetaData, entities):
         self._manager = manager
         self._metadata = metadata
         self._entities = entities
-        self._object_schema = self._load_object_schema()
+        self._object_schema = CompiledSchema(self._load_object_schema())
         self._inputs = set()
+        self._inputs_lock = threading.Lock()
+        self.batch_size = self.DEFAULT_BATCH_SIZE
+        self.maintenance_work_mem = None
+        self.validate_every = 1
+        self._objects_seen = 0
+        self._deferred = []
+        self._objects_loaded = 0
+        self._load_started = time.monotonic()
+
+    def set_load_options(
+        self,
+        batch_size=DEFAULT_BATCH_SIZE,
+        maintenance_work_mem=None,
+        defer_indexes=False,
+        validate_every=1,
+    ):
+        self.batch_size = batch_size
+        self.maintenance_work_mem = maintenance_work_mem
+        # validate only every nth object (0 to not validate at all), for input which
+        # has been validated before
+        self.validate_every = validate_every
+        if defer_indexes:
+            self.defer_indexes()
+
+    def defer_indexes(self):
+        """
+        drop the secondary indexes and unique constraint of the object table, so that
+        they aren't maintained row by row while loading. they are rebuilt, each in a
+        single pass, by `build_indexes`.
+        """
+        object = self._entities["object"]
+        with self._manager.engine.begin() as conn:
+            for index in object.indexes:
+                conn.execute(DropIndex(index))
+                self._deferred.append(CreateIndex(index))
+            for constraint in object.constraints:
+                if isinstance(constraint, UniqueConstraint):
+                    conn.execute(DropConstraint(constraint))
+                    self._deferred.append(AddConstraint(constraint))
+
+    def build_indexes(self):
+        "build any deferred indexes, and then update the planner's statistics"
+        with self._manager.engine.begin() as conn:
+            if self._deferred and self.maintenance_work_mem:
+                conn.execute(
+                    select(
+                        func.set_config(
+                            "maintenance_work_mem", self.maintenance_work_mem, True
+                        )
+                    )
+                )
+            for ddl in self._deferred:
+                started = time.monotonic()
+                conn.execute(ddl)
+                print(
+                    "built {} in {:.1f}s".format(
+                        ddl.element.name, time.monotonic() - started
+                    )
+                )
+            self._deferred = []
+            for name in ("object", "strongs"):
+                conn.exec_driver_sql(
+                    "ANALYZE {}".format(
+                        conn.dialect.identifier_preparer.format_table(
+                            self._entities[name]
+                        )
+                    )
+                )
 
     def _load_object_schema(self):
         schema_file = os.path.join(os.path.dirname(__file__), "v1_object.json")
@@ -163,57 +311,119 @@ class Module:
             conn.execute(insert(book).values(**kwargs))
             conn.commit()
 
-    def import_book_stream(self, linear_id, book_id, entities_iter):
+    def _copy_objects(self, conn, rows):
+        "load a batch of rows (in the order of `COPY_COLUMNS`) with a single `COPY`"
+        object = self._entities["object"]
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join(copy_text(t) for t in row))
+            buf.write("\n")
+        buf.seek(0)
+        stmt = "COPY {} ({}) FROM STDIN".format(
+            conn.dialect.identifier_preparer.format_table(object),
+            ", ".join(self.COPY_COLUMNS),
+        )
+        with conn.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(stmt, buf)
+        self._objects_loaded += len(rows)
+        if len(rows) >= self.batch_size:
+            elapsed = time.monotonic() - self._load_started
+            print(
+                "loaded {} objects ({:.0f}/s)".format(
+                    self._objects_loaded, self._objects_loaded / elapsed
+                )
+            )
+
+    def object_rows(self, linear_id, book_id, entities_iter):
+        """
+        validate each object, and yield its row (in the order of `COPY_COLUMNS`).
+        objects are numbered from `linear_id`.
+        """
+
         def to_plaintext(text):
             return " ".join(t["value"] for t in text)
 
-        object = self._entities["object"]
-        with self._manager.engine.connect() as conn:
-            for obj in entities_iter:
+        for obj in entities_iter:
+            if self.validate_every and self._objects_seen % self.validate_every == 0:
                 try:
-                    validate(obj, self._object_schema)
+                    self._object_schema.validate(obj)
                 except jsonschema.exceptions.ValidationError as e:
                     print("validation of this object failed: {}".format(obj))
                     raise e
-                conn.execute(
-                    insert(object).values(
-                        book_id=book_id,
-                        chapter_start=obj.get("chapter_start"),
-                        verse_start=obj.get("verse_start"),
-                        chapter_end=obj.get("chapter_end"),
-                        verse_end=obj.get("verse_end"),
-                        type=ObjectType.from_json(obj),
-                        linear_id=linear_id,
-                        text=obj.get("text"),
-                        plaintext=to_plaintext(obj.get("text")),
-                    )
-                )
-                linear_id += 1
-            conn.commit()
-        return linear_id
+            self._objects_seen += 1
+            yield (
+                book_id,
+                obj.get("chapter_start"),
+                obj.get("verse_start"),
+                obj.get("chapter_end"),
+                obj.get("verse_end"),
+                # enums are stored by name
+                ObjectType.from_json(obj).name,
+                linear_id,
+                json.dumps(obj.get("text")),
+                to_plaintext(obj.get("text")),
+            )
+            linear_id += 1
 
-    def open_and_log(self, fname, path):
-        def sha256():
-            h = hashlib.sha256()
-            with open(fname, "rb") as fd:
-                while True:
-                    data = fd.read(1 << 16)
-                    if not data:
-                        break
-                    h.update(data)
-            return h.hexdigest()
+    def batches(self, rows):
+        "group rows into batches of `batch_size`"
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def load_batches(self, batches):
+        """
+        load each batch of rows with a `COPY`, all in one transaction, yielding the
+        number of rows in each batch once it has been loaded
+        """
+        # COPY bypasses SQLAlchemy, so the transaction must be begun explicitly
+        with self._manager.engine.begin() as conn:
+            for batch in batches:
+                self._copy_objects(conn, batch)
+                yield len(batch)
+
+    def import_book_stream(self, linear_id, book_id, entities_iter):
+        rows = self.object_rows(linear_id, book_id, entities_iter)
+        for count in self.load_batches(self.batches(rows)):
+            linear_id += count
+        return linear_id
 
+    def record_input(self, fname, path, sha256):
+        """
+        record an input file and its hash. files read in a worker process are hashed
+        there, and recorded with the digest the worker returns.
+        """
         rel_fname = os.path.relpath(fname, path)
-        if rel_fname not in self._inputs:
+        with self._inputs_lock:
+            if rel_fname in self._inputs:
+                return
             self._inputs.add(rel_fname)
-            input = self._entities["input"]
-            with self._manager.engine.connect() as conn:
-                conn.execute(insert(input).values(filename=rel_fname, sha256=sha256()))
-                conn.commit()
+        input = self._entities["input"]
+        with self._manager.engine.connect() as conn:
+            conn.execute(insert(input).values(filename=rel_fname, sha256=sha256))
+            conn.commit()
 
-        return open(fname, "r")
+    def open_and_log(self, fname, path, mode="r"):
+        """
+        open an input file, which is hashed as it is read and recorded when it is
+        closed, so it only has to be read once
+        """
+        return open_hashed(
+            fname,
+            mode,
+            on_close=lambda fname, sha256: self.record_input(fname, path, sha256),
+        )
 
     def complete(self):
+        with self._manager.engine.connect() as conn:
+            self.build_concordance(conn, self._entities)
+            conn.commit()
+        self.build_indexes()
         with self._manager.engine.connect() as conn:
             input = self._entities["input"]
             stmt = select(input.c.sha256).order_by(input.c.filename)
@@ -229,3 +439,6 @@ class Module:
             )
             conn.execute(stmt)
             conn.commit()
+        self._manager.promote(
+            type(self), self._entities["module_info"].schema, h.hexdigest()
+        )
@@ -0,0 +1,21 @@
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+
+class CompiledSchema:
+    """
+    a JSON schema which is checked, and has its validator built, just once. use this
+    rather than `jsonschema.validate`, which does both for every instance.
+    """
+
+    def __init__(self, schema):
+        # the validator for the draft in the schema's `$schema`
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        self._validator = cls(schema)
+
+    def validate(self, instance):
+        "raises the same `ValidationError` as `jsonschema.validate` would"
+        error = best_match(self._validator.iter_errors(instance))
+        if error is not None:
+            raise error
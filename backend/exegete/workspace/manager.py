@@ -1,17 +1,44 @@
 import json
 import os
-import jsonschema
+from exegete.validation import CompiledSchema
 
 
 class WorkspaceManager:
     def __init__(self):
-        self._object_schema = self._load_object_schema()
-        pass
+        schema = self._load_object_schema()
+        self._object_schema = CompiledSchema(schema)
+        # for a patched workspace: the workspace without its cells, and each cell on
+        # its own, so that only the cells a patch changed need to be validated
+        self._outline_schema = CompiledSchema(self._outline(schema))
+        self._cell_schema = CompiledSchema(
+            {
+                "$schema": schema["$schema"],
+                "$defs": schema["$defs"],
+                "$ref": "#/$defs/cell",
+            }
+        )
 
     def _load_object_schema(self):
         schema_file = os.path.join(os.path.dirname(__file__), "v1_workspace.json")
         with open(schema_file) as fd:
             return json.load(fd)
 
+    @staticmethod
+    def _outline(schema):
+        cells = dict(schema["properties"]["cells"])
+        del cells["items"]
+        return dict(schema, properties=dict(schema["properties"], cells=cells))
+
     def validate(self, obj):
-        return jsonschema.validate(obj, self._object_schema)
+        return self._object_schema.validate(obj)
+
+    def validate_patched(self, original, patched):
+        """
+        validate `patched`, the result of `apply_patch` to `original` (which was
+        valid). cells which are shared with `original` are unchanged, so are skipped.
+        """
+        self._outline_schema.validate(patched)
+        unchanged = {id(cell) for cell in original.get("cells", [])}
+        for cell in patched["cells"]:
+            if id(cell) not in unchanged:
+                self._cell_schema.validate(cell)
@@ -0,0 +1,175 @@
+import copy
+import re
+
+
+class PatchError(Exception):
+    "the patch is malformed, or can't be applied to the document"
+
+
+class PatchTestFailed(PatchError):
+    "a `test` operation of the patch didn't match the document"
+
+
+def parse_pointer(pointer):
+    "the tokens of a JSON pointer (RFC 6901)"
+    if not isinstance(pointer, str):
+        raise PatchError("invalid JSON pointer: {!r}".format(pointer))
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError("invalid JSON pointer: {!r}".format(pointer))
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+ARRAY_INDEX = re.compile(r"0|[1-9][0-9]*")
+
+
+def _index(container, token, pointer, append=False):
+    "the array index `token`; with `append`, the index one past the end is allowed"
+    if append and token == "-":
+        return len(container)
+    # RFC 6901: ASCII digits only, with no sign and no leading zeros
+    if not ARRAY_INDEX.fullmatch(token):
+        raise PatchError("invalid array index in {!r}".format(pointer))
+    idx = int(token)
+    if idx > len(container) or (idx == len(container) and not append):
+        raise PatchError("array index out of range in {!r}".format(pointer))
+    return idx
+
+
+def _child(container, token, pointer):
+    if isinstance(container, dict):
+        if token not in container:
+            raise PatchError("no such member in {!r}".format(pointer))
+        return container[token]
+    if isinstance(container, list):
+        return container[_index(container, token, pointer)]
+    raise PatchError("cannot descend into a scalar in {!r}".format(pointer))
+
+
+def _get(doc, tokens, pointer):
+    for token in tokens:
+        doc = _child(doc, token, pointer)
+    return doc
+
+
+def _update(doc, tokens, pointer, fn):
+    """
+    a copy of `doc` with `fn(parent, token)` applied to the parent of `tokens`. only
+    the containers along the path are copied; everything else is shared with `doc`.
+    """
+    if isinstance(doc, dict):
+        doc = dict(doc)
+    elif isinstance(doc, list):
+        doc = list(doc)
+    else:
+        raise PatchError("cannot descend into a scalar in {!r}".format(pointer))
+    if len(tokens) == 1:
+        fn(doc, tokens[0])
+    else:
+        token = tokens[0]
+        if isinstance(doc, list):
+            token = _index(doc, token, pointer)
+        doc[token] = _update(_child(doc, tokens[0], pointer), tokens[1:], pointer, fn)
+    return doc
+
+
+def _add(doc, tokens, pointer, value):
+    if not tokens:
+        return value
+
+    def add(parent, token):
+        if isinstance(parent, list):
+            parent.insert(_index(parent, token, pointer, append=True), value)
+        else:
+            parent[token] = value
+
+    return _update(doc, tokens, pointer, add)
+
+
+def _remove(doc, tokens, pointer):
+    if not tokens:
+        raise PatchError("cannot remove the whole document")
+
+    def remove(parent, token):
+        if isinstance(parent, list):
+            del parent[_index(parent, token, pointer)]
+        elif token in parent:
+            del parent[token]
+        else:
+            raise PatchError("no such member in {!r}".format(pointer))
+
+    return _update(doc, tokens, pointer, remove)
+
+
+def _replace(doc, tokens, pointer, value):
+    if not tokens:
+        return value
+
+    def replace(parent, token):
+        if isinstance(parent, list):
+            parent[_index(parent, token, pointer)] = value
+        elif token in parent:
+            parent[token] = value
+        else:
+            raise PatchError("no such member in {!r}".format(pointer))
+
+    return _update(doc, tokens, pointer, replace)
+
+
+def _operation_value(operation):
+    if "value" not in operation:
+        raise PatchError("{} operation without a value".format(operation["op"]))
+    return operation["value"]
+
+
+def _equal(a, b):
+    "JSON equality: unlike Python, `true` is not `1`"
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    return type(a) is type(b) and a == b
+
+
+def apply_patch(doc, patch):
+    """
+    apply a JSON Patch (RFC 6902) to `doc`, returning the patched document. `doc` is
+    not modified: the result shares every part of `doc` which the patch didn't touch,
+    so unchanged parts can be recognised by identity.
+    """
+    if not isinstance(patch, list):
+        raise PatchError("a patch must be an array of operations")
+    for operation in patch:
+        if not isinstance(operation, dict) or "op" not in operation:
+            raise PatchError("invalid patch operation: {!r}".format(operation))
+        op = operation["op"]
+        pointer = operation.get("path")
+        tokens = parse_pointer(pointer)
+        if op == "add":
+            doc = _add(doc, tokens, pointer, _operation_value(operation))
+        elif op == "remove":
+            doc = _remove(doc, tokens, pointer)
+        elif op == "replace":
+            doc = _replace(doc, tokens, pointer, _operation_value(operation))
+        elif op in ("move", "copy"):
+            from_pointer = operation.get("from")
+            from_tokens = parse_pointer(from_pointer)
+            value = _get(doc, from_tokens, from_pointer)
+            if op == "move":
+                if tokens[: len(from_tokens)] == from_tokens and tokens != from_tokens:
+                    raise PatchError("cannot move {!r} into itself".format(pointer))
+                doc = _remove(doc, from_tokens, from_pointer)
+            else:
+                value = copy.deepcopy(value)
+            doc = _add(doc, tokens, pointer, value)
+        elif op == "test":
+            if not _equal(_get(doc, tokens, pointer), _operation_value(operation)):
+                raise PatchTestFailed("test failed at {!r}".format(pointer))
+        else:
+            raise PatchError("unknown patch operation: {!r}".format(op))
+    return doc
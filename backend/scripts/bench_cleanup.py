@@ -0,0 +1,74 @@
+"""
+micro-benchmark of `exegete.text.cleanup.clean_words`, over the calls recorded in the
+golden output of each corpus, and over a single long verse (the cost of a verse
+should grow linearly with its length). stems are memoised, so after the first run
+the stemmed timings are of the memo, as they are over most of an ingest.
+
+    python scripts/bench_cleanup.py
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from exegete.text import cleanup  # noqa: E402
+
+GOLDEN_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "fixtures", "cleanup"
+)
+CORPORA = ("sblgnt", "netbible", "njps")
+
+
+def load_calls(corpus):
+    with gzip.open(
+        os.path.join(GOLDEN_PATH, corpus + ".json.gz"), "rt", encoding="utf8"
+    ) as fd:
+        return [(t["fragments"], t["stem"]) for t in json.load(fd)]
+
+
+def long_verse(words):
+    "fragments of a verse of `words` words, each fragment a few words with attributes"
+    text = " ".join("word{}, “quoted”".format(i) for i in range(words // 2))
+    parts = text.split(" ")
+    return [
+        {"value": " ".join(parts[i : i + 3]) + " ", "c-strongs": [str(i)]}
+        for i in range(0, len(parts), 3)
+    ]
+
+
+def bench(label, calls, repeat):
+    def run():
+        for fragments, stem in calls:
+            cleanup.clean_words(fragments, stem=stem)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    print(
+        "{:<26} {:>6} calls {:>10.3f}ms {:>10.1f}us/call".format(
+            label, len(calls), best * 1e3, best * 1e6 / len(calls)
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for corpus in CORPORA:
+        bench(corpus, load_calls(corpus), args.repeat)
+    for words in (56, 560, 5600):
+        for stem in (False, True):
+            bench(
+                "verse of {} words{}".format(words, ", stem" if stem else ""),
+                [(long_verse(words), stem)],
+                args.repeat,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+golden output of `exegete.text.cleanup.clean_words`, which decides the word offsets
+that annotations in the frontend are keyed by.
+
+every call the ingests make to `clean_words` is recorded, with its input fragments
+and the words it returned, by parsing each corpus (without loading it into the
+database). `tests/test_cleanup.py` checks the recorded calls against `clean_words`.
+
+record only with a version of `clean_words` which is known to be correct:
+
+    python scripts/cleanup_golden.py --sblgnt /data/exegete-data/SBLGNT/ \\
+        --netbible /data/exegete-data/NET-bible/json/ --njps /data/exegete-data/NJPS/
+
+without `--record`, the corpora are checked against the golden output instead.
+"""
+
+import argparse
+import copy
+import gzip
+import json
+import os
+import sys
+from contextlib import contextmanager
+from lxml import etree
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from exegete.text import cleanup  # noqa: E402
+from exegete.text.ingest import netbible, njps, sblgnt  # noqa: E402
+
+GOLDEN_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "fixtures", "cleanup"
+)
+
+
+def golden_fname(corpus):
+    return os.path.join(GOLDEN_PATH, corpus + ".json.gz")
+
+
+def load_golden(corpus):
+    with gzip.open(golden_fname(corpus), "rt", encoding="utf8") as fd:
+        return json.load(fd)
+
+
+@contextmanager
+def recording(module, calls):
+    "record the calls `module` makes to `clean_words`"
+
+    def clean_words(fragments_iter, stem=False):
+        fragments = [copy.deepcopy(t) for t in fragments_iter]
+        calls.append({"fragments": copy.deepcopy(fragments), "stem": stem})
+        words = cleanup.clean_words(fragments, stem=stem)
+        calls[-1]["words"] = copy.deepcopy(words)
+        return words
+
+    module.clean_words = clean_words
+    try:
+        yield calls
+    finally:
+        module.clean_words = cleanup.clean_words
+
+
+def parse_sblgnt(path):
+    gnt_fname = os.path.join(path, "sblgnt.xml")
+    app_fname = os.path.join(path, "sblgntapp.xml")
+    with open(app_fname, "rb") as fd:
+        apparatus = {
+            sblgnt.book_title(book_elem): etree.tostring(book_elem)
+            for book_elem in sblgnt.iter_books(fd)
+        }
+    with open(gnt_fname, "rb") as fd:
+        for book_id, book_elem in enumerate(sblgnt.iter_books(fd)):
+            app_xml = apparatus.get(sblgnt.book_title(book_elem))
+            sblgnt.load_book(etree.tostring(book_elem), book_id, app_xml)
+
+
+def parse_netbible(path):
+    for fname in netbible.chapter_files(path):
+        with open(fname) as fd:
+            list(netbible.chapter_objects(json.load(fd)))
+
+
+def parse_njps(path):
+    for fname in njps.input_files(path):
+        with open(fname) as fd:
+            list(njps.book_objects(fname, json.load(fd)))
+
+
+CORPORA = {
+    "sblgnt": (sblgnt, parse_sblgnt),
+    "netbible": (netbible, parse_netbible),
+    "njps": (njps, parse_njps),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    for corpus in CORPORA:
+        parser.add_argument("--" + corpus, metavar="PATH")
+    parser.add_argument("--record", action="store_true", help="write the golden output")
+    args = parser.parse_args()
+
+    failed = False
+    for corpus, (module, parse) in CORPORA.items():
+        path = getattr(args, corpus)
+        if path is None:
+            continue
+        with recording(module, []) as calls:
+            parse(path)
+        if args.record:
+            os.makedirs(GOLDEN_PATH, exist_ok=True)
+            # no timestamp, so that recording the same output gives the same file
+            with gzip.GzipFile(golden_fname(corpus), "wb", mtime=0) as fd:
+                fd.write(
+                    json.dumps(calls, ensure_ascii=False, sort_keys=True).encode("utf8")
+                )
+            print("{}: recorded {} calls".format(corpus, len(calls)))
+        elif calls == load_golden(corpus):
+            print("{}: {} calls match".format(corpus, len(calls)))
+        else:
+            print("{}: differs from the golden output".format(corpus))
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+annotations in the frontend are keyed by word offset, so `clean_words` must keep
+splitting words exactly as it always has. run with:
+
+    python -m unittest discover -s tests
+
+the golden output is recorded from each corpus by `scripts/cleanup_golden.py`.
+"""
+
+import gzip
+import json
+import os
+import unittest
+from exegete.text.cleanup import clean_words
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "cleanup")
+CORPORA = ("sblgnt", "netbible", "njps")
+
+
+def load_golden(corpus):
+    with gzip.open(
+        os.path.join(GOLDEN_PATH, corpus + ".json.gz"), "rt", encoding="utf8"
+    ) as fd:
+        return json.load(fd)
+
+
+class GoldenOutputTest(unittest.TestCase):
+    def test_corpora(self):
+        for corpus in CORPORA:
+            calls = load_golden(corpus)
+            self.assertTrue(calls)
+            for idx, call in enumerate(calls):
+                with self.subTest(corpus=corpus, call=idx):
+                    self.assertEqual(
+                        clean_words(call["fragments"], stem=call["stem"]),
+                        call["words"],
+                    )
+
+
+class CleanWordsTest(unittest.TestCase):
+    def test_whitespace(self):
+        # any whitespace breaks a word, not just spaces
+        self.assertEqual(
+            clean_words([{"value": "  In the\xa0beginning\tGod created…\n"}]),
+            [
+                {"value": "In"},
+                {"value": "the"},
+                {"value": "beginning"},
+                {"value": "God"},
+                {"value": "created…", "s-nopunct": "created"},
+            ],
+        )
+
+    def test_word_over_fragments(self):
+        # a word has the attributes of the fragment holding its first character
+        self.assertEqual(
+            clean_words(
+                [
+                    {"value": "whe", "c-strongs": ["G1"]},
+                    {"value": "reupon, he", "c-strongs": ["G2"]},
+                    {"value": " said"},
+                ]
+            ),
+            [
+                {"c-strongs": ["G1"], "value": "whereupon,", "s-nopunct": "whereupon"},
+                {"c-strongs": ["G2"], "value": "he"},
+                {"value": "said"},
+            ],
+        )
+
+    def test_punctuation(self):
+        self.assertEqual(
+            clean_words(
+                [{"value": ""}, {"value": " "}, {"value": "“Light!”"}, {"value": "—"}],
+                stem=True,
+            ),
+            [{"value": "“Light!”—", "s-nopunct": "Light", "s-snowball": "light"}],
+        )
+
+    def test_stem(self):
+        self.assertEqual(
+            clean_words([{"value": "running quickly — the runners’ race"}], stem=True),
+            [
+                {"value": "running", "s-snowball": "run"},
+                {"value": "quickly", "s-snowball": "quick"},
+                {"value": "—", "s-nopunct": "", "s-snowball": ""},
+                {"value": "the"},
+                {"value": "runners’", "s-nopunct": "runners", "s-snowball": "runner"},
+                {"value": "race"},
+            ],
+        )
+
+    def test_fragments_unmodified(self):
+        fragments = [{"value": "a b", "c-strongs": ["G1"]}]
+        clean_words(fragments, stem=True)
+        self.assertEqual(fragments, [{"value": "a b", "c-strongs": ["G1"]}])
+
+
+if __name__ == "__main__":
+    unittest.main()
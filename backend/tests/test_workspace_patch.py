@@ -0,0 +1,250 @@
+"""
+the JSON Patch (RFC 6902) applier used by `PATCH /workspace/{id}`, and the
+validation of patched workspaces. run with:
+
+    python -m unittest discover -s tests
+
+a `PatchTestFailed` is returned to the client as a 409, and any other `PatchError`
+as a 422.
+"""
+
+import copy
+import unittest
+import jsonschema
+from exegete.workspace.manager import WorkspaceManager
+from exegete.workspace.patch import PatchError, PatchTestFailed, apply_patch
+
+
+class AppendixATest(unittest.TestCase):
+    "the examples of RFC 6902, Appendix A"
+
+    def assertPatched(self, doc, patch, expected):
+        original = copy.deepcopy(doc)
+        self.assertEqual(apply_patch(doc, patch), expected)
+        # the document is never modified
+        self.assertEqual(doc, original)
+
+    def test_add_object_member(self):
+        self.assertPatched(
+            {"foo": "bar"},
+            [{"op": "add", "path": "/baz", "value": "qux"}],
+            {"baz": "qux", "foo": "bar"},
+        )
+
+    def test_add_array_element(self):
+        self.assertPatched(
+            {"foo": ["bar", "baz"]},
+            [{"op": "add", "path": "/foo/1", "value": "qux"}],
+            {"foo": ["bar", "qux", "baz"]},
+        )
+
+    def test_remove_object_member(self):
+        self.assertPatched(
+            {"baz": "qux", "foo": "bar"},
+            [{"op": "remove", "path": "/baz"}],
+            {"foo": "bar"},
+        )
+
+    def test_remove_array_element(self):
+        self.assertPatched(
+            {"foo": ["bar", "qux", "baz"]},
+            [{"op": "remove", "path": "/foo/1"}],
+            {"foo": ["bar", "baz"]},
+        )
+
+    def test_replace_value(self):
+        self.assertPatched(
+            {"baz": "qux", "foo": "bar"},
+            [{"op": "replace", "path": "/baz", "value": "boo"}],
+            {"baz": "boo", "foo": "bar"},
+        )
+
+    def test_move_value(self):
+        self.assertPatched(
+            {"foo": {"bar": "baz", "waldo": "fred"}, "qux": {"corge": "grault"}},
+            [{"op": "move", "from": "/foo/waldo", "path": "/qux/thud"}],
+            {"foo": {"bar": "baz"}, "qux": {"corge": "grault", "thud": "fred"}},
+        )
+
+    def test_move_array_element(self):
+        self.assertPatched(
+            {"foo": ["all", "grass", "cows", "eat"]},
+            [{"op": "move", "from": "/foo/1", "path": "/foo/3"}],
+            {"foo": ["all", "cows", "eat", "grass"]},
+        )
+
+    def test_test_success(self):
+        doc = {"baz": "qux", "foo": ["a", 2, "c"]}
+        self.assertPatched(
+            doc,
+            [
+                {"op": "test", "path": "/baz", "value": "qux"},
+                {"op": "test", "path": "/foo/1", "value": 2},
+            ],
+            doc,
+        )
+
+    def test_test_error(self):
+        with self.assertRaises(PatchTestFailed):
+            apply_patch(
+                {"baz": "qux"}, [{"op": "test", "path": "/baz", "value": "bar"}]
+            )
+
+    def test_add_nested_member(self):
+        self.assertPatched(
+            {"foo": "bar"},
+            [{"op": "add", "path": "/child", "value": {"grandchild": {}}}],
+            {"foo": "bar", "child": {"grandchild": {}}},
+        )
+
+    def test_ignore_unrecognized_elements(self):
+        self.assertPatched(
+            {"foo": "bar"},
+            [{"op": "add", "path": "/baz", "value": "qux", "xyz": 123}],
+            {"foo": "bar", "baz": "qux"},
+        )
+
+    def test_add_to_nonexistent_target(self):
+        with self.assertRaises(PatchError):
+            apply_patch(
+                {"foo": "bar"}, [{"op": "add", "path": "/baz/bat", "value": "qux"}]
+            )
+
+    # A.13, a member given twice in one operation, can't survive `json.loads`
+
+    def test_escape_ordering(self):
+        doc = {"/": 9, "~1": 10}
+        self.assertPatched(doc, [{"op": "test", "path": "/~01", "value": 10}], doc)
+
+    def test_compare_strings_and_numbers(self):
+        with self.assertRaises(PatchTestFailed):
+            apply_patch(
+                {"/": 9, "~1": 10}, [{"op": "test", "path": "/~01", "value": "10"}]
+            )
+
+    def test_add_array_value(self):
+        self.assertPatched(
+            {"foo": ["bar"]},
+            [{"op": "add", "path": "/foo/-", "value": ["abc", "def"]}],
+            {"foo": ["bar", ["abc", "def"]]},
+        )
+
+
+class ApplyPatchTest(unittest.TestCase):
+    def test_unchanged_parts_are_shared(self):
+        doc = {"a": {"x": 1}, "b": [{"y": 2}, {"z": 3}]}
+        patched = apply_patch(doc, [{"op": "replace", "path": "/b/1/z", "value": 4}])
+        self.assertIs(patched["a"], doc["a"])
+        self.assertIs(patched["b"][0], doc["b"][0])
+        self.assertIsNot(patched["b"][1], doc["b"][1])
+        self.assertEqual(doc["b"][1], {"z": 3})
+
+    def test_copy_is_not_shared(self):
+        doc = {"a": {"x": 1}}
+        patched = apply_patch(doc, [{"op": "copy", "from": "/a", "path": "/b"}])
+        self.assertEqual(patched["b"], {"x": 1})
+        self.assertIsNot(patched["b"], doc["a"])
+
+    def test_booleans_are_not_numbers(self):
+        with self.assertRaises(PatchTestFailed):
+            apply_patch({"a": 1}, [{"op": "test", "path": "/a", "value": True}])
+
+    def test_unprocessable(self):
+        "each of these is a 422: a `PatchError`, but not a failed test"
+        doc = {"a": [1, 2], "s": "scalar"}
+        patches = {
+            "not an array": {"op": "remove", "path": "/a"},
+            "not an operation": ["remove"],
+            "no op": [{"path": "/a"}],
+            "unknown op": [{"op": "frobnicate", "path": "/a"}],
+            "no path": [{"op": "remove"}],
+            "relative path": [{"op": "remove", "path": "a"}],
+            "no value": [{"op": "add", "path": "/b"}],
+            "no such member": [{"op": "remove", "path": "/b"}],
+            "replace missing member": [{"op": "replace", "path": "/b", "value": 1}],
+            "remove the document": [{"op": "remove", "path": ""}],
+            "out of range": [{"op": "add", "path": "/a/3", "value": 0}],
+            "leading zero": [{"op": "replace", "path": "/a/01", "value": 0}],
+            "negative index": [{"op": "replace", "path": "/a/-1", "value": 0}],
+            "append with replace": [{"op": "replace", "path": "/a/-", "value": 0}],
+            "superscript digit": [{"op": "replace", "path": "/a/²", "value": 0}],
+            "full-width digit": [{"op": "replace", "path": "/a/１", "value": 0}],
+            "into a scalar": [{"op": "add", "path": "/s/x", "value": 0}],
+            "move into itself": [{"op": "move", "from": "/a", "path": "/a/0"}],
+            "missing from": [{"op": "copy", "from": "/b", "path": "/c"}],
+            "test missing member": [{"op": "test", "path": "/b", "value": 1}],
+        }
+        for name, patch in patches.items():
+            with self.subTest(name):
+                with self.assertRaises(PatchError) as cm:
+                    apply_patch(doc, patch)
+                self.assertNotIsInstance(cm.exception, PatchTestFailed)
+
+
+def cell(n):
+    return {
+        "uuid": "00000000-0000-4000-8000-{:012}".format(n),
+        "cell_type": "note",
+        "data": {"n": n},
+    }
+
+
+class ValidatePatchedTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.manager = WorkspaceManager()
+
+    def setUp(self):
+        self.original = {
+            "workspace_format": 1,
+            "global": {"view": {}},
+            "cells": [cell(0), cell(1)],
+            "history": {"undo": [], "redo": []},
+        }
+        self.manager.validate(self.original)
+
+    def patched(self, patch):
+        patched = apply_patch(self.original, patch)
+        self.manager.validate_patched(self.original, patched)
+        return patched
+
+    def test_valid(self):
+        patched = self.patched(
+            [
+                {"op": "replace", "path": "/cells/1/data", "value": {"n": 5}},
+                {"op": "add", "path": "/cells/-", "value": cell(2)},
+                {"op": "move", "from": "/cells/0", "path": "/cells/2"},
+                {"op": "add", "path": "/history/undo/-", "value": {"d": 1}},
+            ]
+        )
+        self.assertEqual(len(patched["cells"]), 3)
+
+    def test_invalid_outline(self):
+        with self.assertRaises(jsonschema.exceptions.ValidationError):
+            self.patched([{"op": "add", "path": "/bogus", "value": 1}])
+
+    def test_invalid_cells(self):
+        bad_cell = {"cell_type": "note", "data": {}}
+        patches = {
+            "add": [{"op": "add", "path": "/cells/1", "value": bad_cell}],
+            "replace": [{"op": "replace", "path": "/cells/0", "value": bad_cell}],
+            "nested add": [{"op": "add", "path": "/cells/0/bogus", "value": 1}],
+            "nested replace": [
+                {"op": "replace", "path": "/cells/1/data", "value": "text"}
+            ],
+            "nested remove": [{"op": "remove", "path": "/cells/0/uuid"}],
+            "copy": [{"op": "copy", "from": "/global", "path": "/cells/-"}],
+            "move": [{"op": "move", "from": "/global", "path": "/cells/0"}],
+            "move into a cell": [
+                {"op": "move", "from": "/history", "path": "/cells/0/data/h"},
+                {"op": "move", "from": "/cells/0/data", "path": "/cells/1/data"},
+            ],
+        }
+        for name, patch in patches.items():
+            with self.subTest(name):
+                with self.assertRaises(jsonschema.exceptions.ValidationError):
+                    self.patched(patch)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -31,26 +31,104 @@ const cache_key = (params: ScriptureParams): string => {
     return `${params.shortcode}_${params.book}_${params.chapter_start}_${params.verse_start}_${params.chapter_end}_${params.verse_end}`;
 };
 
-export const getScripture = async (params: ScriptureParams): Promise<ScriptureObject[]> => {
-    const make_promise = async () => {
-        try {
-            const { book, shortcode, ...range } = params;
-            const url = `/api/v1/scripture/verses/${shortcode}/${book}`;
-            const resp = await axios.get<ScriptureObject[]>(url, { params: range });
-            return resp.data;
-        } catch (error: any) {
-            return [
-                {
-                    type: "error",
-                    chapter_start: 0,
-                    chapter_end: 0,
-                    verse_start: 0,
-                    verse_end: 0,
-                    text: [],
-                },
-            ];
+// the key the backend uses for each reference in a batch response
+const batch_key = (params: ScriptureParams): string => {
+    return `${params.shortcode}/${params.book}/${params.chapter_start}:${params.verse_start}-${params.chapter_end}:${params.verse_end}`;
+};
+
+const errorResult = (): ScriptureObject[] => [
+    {
+        type: "error",
+        chapter_start: 0,
+        chapter_end: 0,
+        verse_start: 0,
+        verse_end: 0,
+        text: [],
+    },
+];
+
+// requests made while a workspace is rendering are collected, and then fetched
+// in as few round trips as possible
+const maxBatchSize = 100;
+// while the server is starting up it answers 503: wait, and try again
+const maxRetries = 5;
+const defaultRetryAfter = 5;
+let pendingBatch: [ScriptureParams, (objs: ScriptureObject[]) => void][] = [];
+
+type BatchEntry = ScriptureObject[] | { detail: string } | null;
+
+// a failed fetch isn't cached, so that it is tried again next time
+const uncache = (params: ScriptureParams) => {
+    const key = cache_key(params);
+    scriptureCache = scriptureCache.filter(([k]) => k !== key);
+};
+
+const toResult = (params: ScriptureParams, entry: BatchEntry): ScriptureObject[] => {
+    if (entry === null) {
+        // empty range
+        return [];
+    }
+    if (!Array.isArray(entry)) {
+        uncache(params);
+        return errorResult();
+    }
+    return entry;
+};
+
+// a single range is fetched with a GET, which the browser can cache
+const fetchOne = async (params: ScriptureParams): Promise<ScriptureObject[]> => {
+    const { book, shortcode, ...range } = params;
+    const url = `/api/v1/scripture/verses/${shortcode}/${book}`;
+    const resp = await axios.get<ScriptureObject[] | "">(url, { params: range });
+    // an empty range has an empty body
+    return resp.data === "" ? [] : resp.data;
+};
+
+const fetchBatch = async (batch: [ScriptureParams, (objs: ScriptureObject[]) => void][], attempt = 0) => {
+    try {
+        if (batch.length === 1) {
+            const [params, resolve] = batch[0];
+            resolve(await fetchOne(params));
+            return;
+        }
+        const references = batch.map(([params]) => {
+            const { shortcode, book, chapter_start, verse_start, chapter_end, verse_end } = params;
+            return { shortcode, book, chapter_start, verse_start, chapter_end, verse_end };
+        });
+        const url = "/api/v1/scripture/verses:batch";
+        const resp = await axios.post<{ [key: string]: BatchEntry }>(url, { references });
+        for (const [params, resolve] of batch) {
+            resolve(toResult(params, resp.data[batch_key(params)] ?? null));
         }
-    };
+    } catch (error: any) {
+        if (error.response?.status === 503 && attempt < maxRetries) {
+            const retryAfter = Number(error.response.headers["retry-after"]) || defaultRetryAfter;
+            setTimeout(() => fetchBatch(batch, attempt + 1), retryAfter * 1000);
+            return;
+        }
+        for (const [params, resolve] of batch) {
+            uncache(params);
+            resolve(errorResult());
+        }
+    }
+};
+
+const flushBatch = () => {
+    const batch = pendingBatch;
+    pendingBatch = [];
+    for (let i = 0; i < batch.length; i += maxBatchSize) {
+        fetchBatch(batch.slice(i, i + maxBatchSize));
+    }
+};
+
+export const getScripture = async (params: ScriptureParams): Promise<ScriptureObject[]> => {
+    const make_promise = () =>
+        new Promise<ScriptureObject[]>((resolve) => {
+            if (pendingBatch.length === 0) {
+                setTimeout(flushBatch, 0);
+            }
+            pendingBatch.push([params, resolve]);
+        });
 
     const key = cache_key(params);
     const match = scriptureCache.find(([k]) => key === k);
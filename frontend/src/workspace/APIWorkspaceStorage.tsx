@@ -2,6 +2,7 @@ import { ApiAxiosRequestConfig } from "../user/JWT";
 import axios from "axios";
 import { NewWorkspaceData, WorkspaceMetadata } from "./Types";
 import sanitize from "sanitize-filename";
+import { diffJSON } from "./JSONPatch";
 
 export const loadWorkspaceAPI = async (id: string) => {
     const resp = await axios.get<WorkspaceMetadata>(`/api/v1/workspace/${id}`, ApiAxiosRequestConfig());
@@ -23,16 +24,44 @@ export const downloadWorkspaceAPI = async (id: string, title: string) => {
     link.click();
 };
 
-export const saveWorkspaceAPI = async (workspace: WorkspaceMetadata) => {
-    const resp = await axios.put<WorkspaceMetadata>(
-        `/api/v1/workspace/${workspace.id}`,
-        workspace,
+interface WorkspaceVersion {
+    readonly version: number;
+}
+
+// saves the workspace, returning its new version. if the server has `last` (the last
+// version saved or loaded), just the changes since then are sent.
+export const saveWorkspaceAPI = async (workspace: WorkspaceMetadata, last?: WorkspaceMetadata): Promise<number> => {
+    const url = `/api/v1/workspace/${workspace.id}`;
+    if (last && last.version !== undefined && last.id === workspace.id) {
+        const patch = diffJSON("", last.data, workspace.data);
+        const title = workspace.title !== last.title ? workspace.title : undefined;
+        if (patch.length === 0 && title === undefined) {
+            return last.version;
+        }
+        try {
+            const resp = await axios.patch<WorkspaceVersion>(
+                url,
+                { version: last.version, patch: patch, title: title },
+                ApiAxiosRequestConfig(),
+            );
+            return resp.data.version;
+        } catch (error: any) {
+            // 409: the workspace has been saved elsewhere (say, in another tab) since
+            // `last`. the whole workspace is sent instead, so the last save wins, as it
+            // always has. 422: the patch didn't apply, so the whole workspace is sent too
+            const status = error.response?.status;
+            if (status !== 409 && status !== 422) {
+                throw error;
+            }
+        }
+    }
+    // without a version, the PUT replaces whatever the server has
+    const resp = await axios.put<WorkspaceVersion>(
+        url,
+        { title: workspace.title, data: workspace.data },
         ApiAxiosRequestConfig(),
     );
-    if (resp.status === 200) {
-        return true;
-    }
-    return false;
+    return resp.data.version;
 };
 
 export const createWorkspaceAPI = async (newData: NewWorkspaceData): Promise<void> => {
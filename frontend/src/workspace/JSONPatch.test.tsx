@@ -0,0 +1,54 @@
+import { diffJSON } from "./JSONPatch";
+
+const cell = (uuid: string, n: number) => ({ uuid: uuid, cell_type: "markdown", data: { n: n } });
+
+const workspace = () => ({
+    workspace_format: 7,
+    global: { view: { textSize: "medium" } },
+    cells: [cell("a", 1), cell("b", 2), cell("c", 3)],
+    history: { undo: [{ d: 1 }], redo: [{ d: 2 }] },
+});
+
+test("unchanged", () => {
+    expect(diffJSON("", workspace(), workspace())).toEqual([]);
+});
+
+test("edit a cell", () => {
+    const to = workspace();
+    to.cells[1] = cell("b", 5);
+    expect(diffJSON("", workspace(), to)).toEqual([{ op: "replace", path: "/cells/1", value: cell("b", 5) }]);
+});
+
+test("delete a cell", () => {
+    const to = workspace();
+    to.cells = [cell("a", 1), cell("c", 3)];
+    expect(diffJSON("", workspace(), to)).toEqual([{ op: "remove", path: "/cells/1" }]);
+});
+
+test("add a cell", () => {
+    const to = workspace();
+    to.cells = [...to.cells, cell("d", 4)];
+    expect(diffJSON("", workspace(), to)).toEqual([{ op: "add", path: "/cells/3", value: cell("d", 4) }]);
+});
+
+test("push undo history", () => {
+    const to = workspace();
+    to.history = { undo: [{ d: 3 }, { d: 1 }], redo: [] };
+    expect(diffJSON("", workspace(), to)).toEqual([
+        { op: "add", path: "/history/undo/0", value: { d: 3 } },
+        { op: "remove", path: "/history/redo/0" },
+    ]);
+});
+
+test("escape keys", () => {
+    expect(diffJSON("", { "a/b": 1 }, { "a/b": 2, "c~": 3 })).toEqual([
+        { op: "replace", path: "/a~1b", value: 2 },
+        { op: "add", path: "/c~0", value: 3 },
+    ]);
+});
+
+test("replace a long array whole", () => {
+    const from = Array.from({ length: 40 }, (_, i) => i);
+    const to = from.map((i) => i + 1000);
+    expect(diffJSON("/a", from, to)).toEqual([{ op: "replace", path: "/a", value: to }]);
+});
@@ -0,0 +1,81 @@
+// the JSON Patch (RFC 6902) operations which `diffJSON` makes
+export interface PatchOperation {
+    readonly op: "add" | "remove" | "replace";
+    readonly path: string;
+    readonly value?: any;
+}
+
+// beyond this many operations, an array is replaced as a whole
+const maxArrayOperations = 16;
+
+const pointer = (path: string, key: string | number) =>
+    `${path}/${String(key).replace(/~/g, "~0").replace(/\//g, "~1")}`;
+
+const isObject = (v: any) => v !== null && typeof v === "object" && !Array.isArray(v);
+
+// unchanged parts of the workspace are usually the same objects, so that's checked first
+const same = (a: any, b: any) => a === b || JSON.stringify(a) === JSON.stringify(b);
+
+// array elements (such as cells) are replaced whole, rather than diffed
+const diffArray = (path: string, from: ReadonlyArray<any>, to: ReadonlyArray<any>): PatchOperation[] => {
+    let start = 0;
+    while (start < from.length && start < to.length && same(from[start], to[start])) {
+        start++;
+    }
+    let end = 0;
+    while (
+        end < from.length - start &&
+        end < to.length - start &&
+        same(from[from.length - 1 - end], to[to.length - 1 - end])
+    ) {
+        end++;
+    }
+    const removed = from.length - start - end;
+    const added = to.length - start - end;
+    const common = Math.min(removed, added);
+    const ops: PatchOperation[] = [];
+    for (let i = 0; i < common; i++) {
+        ops.push({ op: "replace", path: pointer(path, start + i), value: to[start + i] });
+    }
+    // from the end, so that the index of each element is unchanged when it's removed
+    for (let i = removed - 1; i >= common; i--) {
+        ops.push({ op: "remove", path: pointer(path, start + i) });
+    }
+    for (let i = common; i < added; i++) {
+        ops.push({ op: "add", path: pointer(path, start + i), value: to[start + i] });
+    }
+    if (ops.length > maxArrayOperations) {
+        return [{ op: "replace", path: path, value: to }];
+    }
+    return ops;
+};
+
+// a JSON Patch which turns `from` into `to`
+export const diffJSON = (path: string, from: any, to: any): PatchOperation[] => {
+    if (from === to) {
+        return [];
+    }
+    if (Array.isArray(from) && Array.isArray(to)) {
+        return diffArray(path, from, to);
+    }
+    if (isObject(from) && isObject(to)) {
+        const ops: PatchOperation[] = [];
+        for (const key of Object.keys(from)) {
+            if (!(key in to)) {
+                ops.push({ op: "remove", path: pointer(path, key) });
+            }
+        }
+        for (const key of Object.keys(to)) {
+            if (!(key in from)) {
+                ops.push({ op: "add", path: pointer(path, key), value: to[key] });
+            } else {
+                ops.push(...diffJSON(pointer(path, key), from[key], to[key]));
+            }
+        }
+        return ops;
+    }
+    if (same(from, to)) {
+        return [];
+    }
+    return [{ op: "replace", path: path, value: to }];
+};
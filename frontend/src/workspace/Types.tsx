@@ -49,6 +49,9 @@ export interface WorkspaceMetadata {
     readonly data: WorkspaceData;
     readonly created: Date;
     readonly updated: Date | null;
+    // the version saved on the server, which a PATCH is made against. local
+    // workspaces don't have one
+    readonly version?: number;
 }
 
 // minimal set of metadata set on the frontend
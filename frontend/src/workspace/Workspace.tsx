@@ -248,9 +248,12 @@ export const LoadWorkspace = createAsyncThunk(
                 local: local,
             };
         } else {
-            const workspace = MigrateWorkspace(await loadWorkspaceAPI(id));
+            const loaded = await loadWorkspaceAPI(id);
+            const workspace = MigrateWorkspace(loaded);
+            // the server has the workspace from before it was migrated, so a patch
+            // can't be made against it: without a version, the first save sends it all
             return {
-                workspace: workspace,
+                workspace: workspace && workspace !== loaded ? { ...workspace, version: undefined } : workspace,
                 local: local,
             };
         }
@@ -295,12 +298,14 @@ export const SaveWorkspace = createAsyncThunk("workspace/save", async (arg, thun
         };
     };
 
-    const save = async (workspace: WorkspaceMetadata) => {
+    // returns the workspace as saved, with its new version
+    const save = async (workspace: WorkspaceMetadata): Promise<WorkspaceMetadata> => {
         if (state.local) {
             saveWorkspaceLocal(workspace);
-        } else {
-            await saveWorkspaceAPI(workspace);
+            return workspace;
         }
+        const version = await saveWorkspaceAPI(workspace, state.last_workspace);
+        return { ...workspace, version: version };
     };
 
     if (state.dirty === DirtyState.MAKE_DELTA) {
@@ -308,8 +313,7 @@ export const SaveWorkspace = createAsyncThunk("workspace/save", async (arg, thun
         if (!delta) {
             return { changed: false };
         }
-        const workspace = makeWorkspaceWithDelta(delta);
-        await save(workspace);
+        const workspace = await save(makeWorkspaceWithDelta(delta));
         return {
             changed: true,
             workspace: workspace,
@@ -319,10 +323,9 @@ export const SaveWorkspace = createAsyncThunk("workspace/save", async (arg, thun
         // we're pushing the current workspace state up without calculating a delta:
         // if we're applying an undo or a redo, we wouldn't want to calculate how
         // to undo the undo!
-        await save(state.workspace);
         return {
             changed: true,
-            workspace: state.workspace,
+            workspace: await save(state.workspace),
             set_history: false,
         };
     }